@@ -2,8 +2,15 @@ from functools import partial
 
 import nengo
 import numpy as np
+from nengo.builder.ensemble import gen_eval_points, get_gain_bias
+from nengo.builder.network import seed_network
+from nengo.dists import Uniform, UniformHypersphere, get_samples
 from nengo.processes import Piecewise
-from nengo.dists import Uniform
+from nengo.utils.builder import default_n_eval_points
+
+from damage import ensemble_names, neuron_indices, schedule_process
+from inputs import ScheduleInput
+from speed import ramp, speed_output
 
 """
 For one dimensional variable in range (-1, 1)
@@ -18,6 +25,119 @@ slowly responding to changes
 tau = 0.01
 
 
+def unit(x):
+    """
+    Parameter free part of constant drive in recurrent connections
+    """
+    return 1
+
+
+def complement(x):
+    """
+    Parameter free part of connections between states
+    """
+    return 1 - x
+
+
+def threshold(x):
+    """
+    Shifts state before switcher threshold ensembles
+    """
+    return x - 0.5
+
+
+"""
+Nengo evaluates functions on eval points even when decoders are given,
+small grid keeps this work negligible for precomputed decoders
+"""
+solver_eval_points = np.linspace(0, 1, 11).reshape(-1, 1)
+
+
+def state_population(n_neurons, rng, neuron_type="LIF"):
+    """
+    Function samples one set of encoders, gains, biases and eval points
+    with nengo default distributions for a state ensemble
+    neuron_type is name of nengo neuron type
+    """
+    neuron_type = getattr(nengo, neuron_type)()
+    max_rates = Uniform(200, 400).sample(n_neurons, rng=rng)
+    intercepts = Uniform(-1, 1).sample(n_neurons, rng=rng)
+    gain, bias = neuron_type.gain_bias(max_rates, intercepts)
+
+    return {
+        "neuron_type": neuron_type,
+        "encoders": UniformHypersphere(surface=True).sample(n_neurons, 1, rng=rng),
+        "gain": gain,
+        "bias": bias,
+        # Nengo default number of points over the integrated range (0, 1)
+        "eval_points": Uniform(0, 1).sample(default_n_eval_points(n_neurons, 1), 1, rng=rng),
+    }
+
+
+def built_populations(model):
+    """
+    Function samples eval points, encoders, gains and biases of state
+    ensembles of model with the seeds and in the order nengo builder
+    does it, so they are the populations of the built model
+    Returns dictionary {ensemble name: population}
+    """
+    seeds = {}
+    seed_network(model, seeds=seeds, seeded={})
+
+    populations = {}
+    for name in ensemble_names:
+        ensemble = getattr(model, name)
+        rng = np.random.RandomState(seeds[ensemble])
+        eval_points = gen_eval_points(ensemble, ensemble.eval_points, rng=rng)
+        encoders = get_samples(ensemble.encoders, ensemble.n_neurons, ensemble.dimensions, rng=rng)
+        encoders = encoders / np.linalg.norm(encoders, axis=1, keepdims=True)
+        gain, bias, _, _ = get_gain_bias(ensemble, rng)
+
+        populations[name] = {
+            "neuron_type": ensemble.neuron_type,
+            "encoders": encoders,
+            "gain": gain,
+            "bias": bias,
+            "eval_points": eval_points,
+        }
+
+    return populations
+
+
+def remove_neurons(population, neurons):
+    """
+    Function returns population without given neurons
+    """
+    keep = np.setdiff1d(np.arange(len(population["gain"])), neurons)
+
+    return dict(population,
+                encoders=population["encoders"][keep],
+                gain=population["gain"][keep],
+                bias=population["bias"][keep],
+                )
+
+
+def solve_decoders(population, eval_points, functions):
+    """
+    Function solves decoders of state population for several functions
+    the same way nengo does it with default LstsqL2 solver, activities are
+    computed once and all functions are solved in one call
+    functions is {key: function}, None is identity, every function is applied
+    to the whole (points x 1) eval points array, functions of create_CPG are elementwise
+    Returns {key: (neurons x 1) decoders}
+    """
+    x = np.dot(eval_points, population["encoders"].T / radius)
+    activities = population["neuron_type"].rates(x, population["gain"], population["bias"])
+
+    targets = np.column_stack([eval_points if function is None else
+                               np.broadcast_to(function(eval_points), eval_points.shape)
+                               for function in functions.values()])
+
+    decoders, _ = nengo.solvers.LstsqL2()(activities, targets)
+
+    return {key: decoders[:, [i]] for i, key in enumerate(functions)}
+
+
 def create_CPG(*, params, time, state_neurons=400, **args):
     """
     Functions creates spiking CPG model using input parameters
@@ -32,6 +152,42 @@ def create_CPG(*, params, time, state_neurons=400, **args):
     state_neurons : int
         Number of parameters to use for swing and stance
         state representation including integrator and speed control      
+    linear_transforms : bool, optional
+        If True, connections decode only parameter free functions
+        (x, 1 - x, 1) and parameters are applied as connection transforms,
+        so decoders could be reused from nengo decoder cache between trials
+    shared_decoders : bool, optional
+        If True, all eight state ensembles share encoders, gains and biases
+        and decoders of all functions are solved together, once for recurrent
+        connections and once for the others with nengo default number of eval points
+    lesioned_neurons : dict, optional
+        Static lesion, neurons to remove from state ensembles at build time
+        as {ensemble name: count of first neurons or indices}, see damage.static_lesion,
+        remaining neurons are the ones nengo builds for the model without lesion
+    compensated : bool, optional
+        If True, decoders of lesioned ensembles are solved again
+        for the remaining neurons, otherwise lesioned neurons are just
+        dropped from intact decoders
+    speed_profile : dict, optional
+        Speed profile made by speed.constant, ramp, piecewise or sampled,
+        speed_f callable is still accepted
+    damage : list of dicts, optional
+        Damage schedule made of damage.lesion events, it is compiled into
+        one piecewise input of all eight state ensembles
+    mutable_inputs : bool, optional
+        If True, speed and damage come from inputs.ScheduleInput processes
+        model.speed_input and model.damage_input, their schedules could be
+        replaced between runs of one simulator
+    neuron_type : str, optional
+        Name of nengo neuron type of state ensembles, "LIF" by default,
+        "LIFRate" simulates the same ensembles without spikes
+    seed : int, optional
+        Seed of every random draw of the model: nengo network seed,
+        eval points and sampled populations, simulator seed is derived
+        from it by nengo, 42 by default
+        Simulators built with nengo op-merge optimizer still differ slightly
+        between builds of the same model, only optimize=False builds and
+        simulators of one model_cache entry are identical
     Returns
     -------
     Nengo model
@@ -62,110 +218,206 @@ def create_CPG(*, params, time, state_neurons=400, **args):
         dx = params["speed_stance"] * speed
         return dx * tau
 
+    def coupling_function(con):
+        """
+        Function returns connection function tau * (1 - x) * params[con] between states
+        """
+        return lambda x: tau * (1 - x) * params[con]
+
     def positive_signal(x):
         """
         Function implements inhibition for state neurons in case
         state variable is bigger then 0
         We use this function to switch active group 
+        Scalar output is spread over all state neurons by
+        connection transform, so decoders are solved only once
         """
         if x > 0:
-            return [-100] * state_neurons
+            return 1
         else:
-            return [0] * state_neurons
+            return 0
 
     def negative_signal(x):
         if x < 0:
-            return [-100] * state_neurons
+            return 1
         else:
-            return [0] * state_neurons
-
-    model = nengo.Network(seed=42)
+            return 0
+
+    linear = args.get("linear_transforms", False)
+    shared = args.get("shared_decoders", False)
+    lesioned = {name: neuron_indices(neurons)
+                for name, neurons in args.get("lesioned_neurons", {}).items()}
+    compensated = args.get("compensated", False)
+    neuron_type = args.get("neuron_type", "LIF")
+    mutable = args.get("mutable_inputs", False)
+
+    # Shared and lesioned populations are sampled here,
+    # so their decoders are solved by solve_decoders
+    explicit = shared or "lesioned_neurons" in args
+
+    # Functions decoded from state ensembles by eval points of their connections:
+    # recurrent ones use the fixed sample, the others eval points of the ensemble
+    # Decoders of a population are solved for all functions of a group at once
+    if linear:
+        decoded = {"sample": {"identity": None, "unit": unit},
+                   "ensemble": {"complement": complement, "threshold": threshold}}
+    else:
+        cons = [f"{pre}_{post}_con{suffix}" for suffix in ("", "_new")
+                for pre in ("sw", "st") for post in ("sw", "st")]
+        decoded = {"sample": {"swing_feedback": swing_feedback,
+                              "stance_feedback": stance_feedback},
+                   "ensemble": dict({con: coupling_function(con) for con in cons},
+                                    threshold=threshold)}
+
+    model = nengo.Network(seed=args.get("seed", 42))
     with model:
         # Becase we integrate from 0 to 1
         # There is no point to train our connections on negative numbers
         eval_points_dist = Uniform(0, 1)
 
-        ## creating main state variables
-        model.swing1 = nengo.Ensemble(state_neurons, 1, radius=radius,
-                                      label="swing1",
-                                      eval_points=eval_points_dist
-                                      )
-
-        model.stance1 = nengo.Ensemble(state_neurons, 1, radius=radius,
-                                       label="stance1",
-                                       eval_points=eval_points_dist
-                                       )
-
-        model.swing2 = nengo.Ensemble(state_neurons, 1, radius=radius,
-                                      label="swing2",
-                                      eval_points=eval_points_dist
-                                      )
-
-        model.stance2 = nengo.Ensemble(state_neurons, 1, radius=radius,
-                                       label="stance2",
-                                       eval_points=eval_points_dist
-                                       )
-
-        model.swing3 = nengo.Ensemble(state_neurons, 1, radius=radius,
-                                      label="swing3",
-                                      eval_points=eval_points_dist
+        # Nengo automatically sample points for training
+        # In out case we want to control this process
+        # Sample depends only on the seed, so runs with the same arguments
+        # are the same and parameter free decoders stay in the decoder cache
+        eval_points_sample = np.random.RandomState(model.seed).rand(10000, 1)
+
+        if shared:
+            # All state ensembles use one population and one training set,
+            # so decoders are solved once per function and reused
+            population = state_population(state_neurons, np.random.RandomState(model.seed),
+                                          neuron_type
+                                          )
+            intact = {name: population for name in ensemble_names}
+        elif explicit:
+            # Intact populations are the ones nengo builds for the model
+            # without lesion, so lesion of no neurons gives the same model
+            intact = built_populations(create_CPG(
+                    params=params, time=time, state_neurons=state_neurons,
+                    **{key: value for key, value in args.items()
+                       if key not in ("lesioned_neurons", "compensated")}
+            ))
+
+        if explicit:
+
+            # Lesioned neurons are not simulated at all
+            populations = {name: remove_neurons(intact[name], lesioned.get(name, []))
+                           for name in ensemble_names}
+            decoders = {}
+
+        def state_ensemble(label):
+            if explicit:
+                population = populations[label]
+                return nengo.Ensemble(len(population["gain"]), 1, radius=radius,
+                                      label=label,
+                                      encoders=population["encoders"],
+                                      gain=population["gain"],
+                                      bias=population["bias"],
+                                      neuron_type=population["neuron_type"],
+                                      eval_points=eval_points_sample
                                       )
 
-        model.stance3 = nengo.Ensemble(state_neurons, 1, radius=radius,
-                                       label="stance3",
-                                       eval_points=eval_points_dist
-                                       )
+            return nengo.Ensemble(state_neurons, 1, radius=radius,
+                                  label=label,
+                                  neuron_type=getattr(nengo, neuron_type)(),
+                                  eval_points=eval_points_dist
+                                  )
 
-        model.swing4 = nengo.Ensemble(state_neurons, 1, radius=radius,
-                                      label="swing4",
-                                      eval_points=eval_points_dist
-                                      )
+        def decoding(pre, function, key, eval_points=None):
+            """
+            Function returns connection arguments for decoding function from state ensemble
+            key names function in "decoded", decoders of all its group are solved
+            once per population, with shared decoders once per set of lesioned neurons
+            """
+            if not explicit:
+                if eval_points is None:
+                    return dict(function=function)
+                return dict(function=function, eval_points=eval_points)
+
+            killed = lesioned.get(pre.label, [])
+            # Like nengo, connection eval points replace the ensemble ones
+            group = "ensemble" if eval_points is None else "sample"
+            memo = (None if shared else pre.label, tuple(killed) if compensated else (), group)
+            if memo not in decoders:
+                points = intact[pre.label]["eval_points"] if eval_points is None else eval_points
+                population = populations[pre.label] if compensated else intact[pre.label]
+                decoders[memo] = solve_decoders(population, points, decoded[group])
+
+            # Decoders of intact population just lose lesioned neurons
+            values = decoders[memo][key]
+            if not compensated:
+                values = np.delete(values, killed, axis=0)
+
+            # Nengo still evaluates the function on eval points, but
+            # the result is replaced by precomputed decoders
+            return dict(function=function,
+                        solver=nengo.solvers.NoSolver(values),
+                        eval_points=solver_eval_points
+                        )
 
-        model.stance4 = nengo.Ensemble(state_neurons, 1, radius=radius,
-                                       label="stance4",
-                                       eval_points=eval_points_dist
-                                       )
+        ## creating main state variables
+        model.swing1 = state_ensemble("swing1")
+        model.stance1 = state_ensemble("stance1")
+        model.swing2 = state_ensemble("swing2")
+        model.stance2 = state_ensemble("stance2")
+        model.swing3 = state_ensemble("swing3")
+        model.stance3 = state_ensemble("stance3")
+        model.swing4 = state_ensemble("swing4")
+        model.stance4 = state_ensemble("stance4")
         ###############################################################
 
-        # Nengo automatically sample points for training
-        # In out case we want to control this process
-        eval_points_sample = np.random.rand(10000, 1)
+        def feedback(ensemble, phase):
+            """
+            Function sets reccurent connection that is part of cpg dynamics
+            x + tau * (init + inner_inhibit * x) in both build modes
+            """
+            if linear:
+                nengo.Connection(ensemble, ensemble,
+                                 transform=1 + tau * params["inner_inhibit"],
+                                 synapse=tau,
+                                 **decoding(ensemble, None, "identity", eval_points_sample)
+                                 )
+                # Constant is decoded from the state itself, so it vanishes
+                # together with the state when the ensemble is inhibited
+                nengo.Connection(ensemble, ensemble,
+                                 transform=tau * params[f"init_{phase}"],
+                                 synapse=tau,
+                                 **decoding(ensemble, unit, "unit", eval_points_sample)
+                                 )
+            else:
+                nengo.Connection(ensemble, ensemble,
+                                 synapse=tau,
+                                 **decoding(ensemble, swing_feedback if phase == "swing"
+                                            else stance_feedback,
+                                            f"{phase}_feedback", eval_points_sample)
+                                 )
+
+        def coupling(pre, post, con):
+            """
+            Function sets connection tau * (1 - x) * params[con] between states
+            """
+            if linear:
+                nengo.Connection(pre, post,
+                                 transform=tau * params[con],
+                                 synapse=tau,
+                                 **decoding(pre, complement, "complement")
+                                 )
+            else:
+                nengo.Connection(pre, post,
+                                 synapse=tau,
+                                 **decoding(pre, coupling_function(con), con)
+                                 )
 
         # Setting reccurent connections that is part of cpg dynamics
-        nengo.Connection(model.swing1, model.swing1,
-                         function=swing_feedback,
-                         synapse=tau, eval_points=eval_points_sample
-                         )
-        nengo.Connection(model.stance1, model.stance1,
-                         function=stance_feedback,
-                         synapse=tau, eval_points=eval_points_sample
-                         )
-        nengo.Connection(model.swing2, model.swing2,
-                         function=swing_feedback,
-                         synapse=tau, eval_points=eval_points_sample
-                         )
-        nengo.Connection(model.stance2, model.stance2,
-                         function=stance_feedback,
-                         synapse=tau, eval_points=eval_points_sample
-                         )
+        feedback(model.swing1, "swing")
+        feedback(model.stance1, "stance")
+        feedback(model.swing2, "swing")
+        feedback(model.stance2, "stance")
 
         ###############################################################
-        nengo.Connection(model.swing3, model.swing3,
-                         function=swing_feedback,
-                         synapse=tau, eval_points=eval_points_sample
-                         )
-        nengo.Connection(model.stance3, model.stance3,
-                         function=stance_feedback,
-                         synapse=tau, eval_points=eval_points_sample
-                         )
-        nengo.Connection(model.swing4, model.swing4,
-                         function=swing_feedback,
-                         synapse=tau, eval_points=eval_points_sample
-                         )
-        nengo.Connection(model.stance4, model.stance4,
-                         function=stance_feedback,
-                         synapse=tau, eval_points=eval_points_sample
-                         )
+        feedback(model.swing3, "swing")
+        feedback(model.stance3, "stance")
+        feedback(model.swing4, "swing")
+        feedback(model.stance4, "stance")
         ###############################################################
 
         # Setting connections between states for four limbs iteratively
@@ -181,58 +433,20 @@ def create_CPG(*, params, time, state_neurons=400, **args):
                       (model.swing4, model.stance4, model.swing1, model.stance1),
                       (model.swing4, model.stance4, model.swing3, model.stance3)]:
             swing_left, stance_left, swing_right, stance_right = group
-            nengo.Connection(swing_left, swing_right,
-                             function=lambda x:
-                             tau * (1 - x) * params["sw_sw_con"],
-                             synapse=tau
-                             )
-
-            nengo.Connection(swing_left, stance_right,
-                             function=lambda x:
-                             tau * (1 - x) * params["sw_st_con"],
-                             synapse=tau
-                             )
-
-            nengo.Connection(stance_left, swing_right,
-                             function=lambda x:
-                             tau * (1 - x) * params["st_sw_con"],
-                             synapse=tau
-                             )
-
-            nengo.Connection(stance_left, stance_right,
-                             function=lambda x:
-                             tau * (1 - x) * params["st_st_con"],
-                             synapse=tau
-                             )
+            coupling(swing_left, swing_right, "sw_sw_con")
+            coupling(swing_left, stance_right, "sw_st_con")
+            coupling(stance_left, swing_right, "st_sw_con")
+            coupling(stance_left, stance_right, "st_st_con")
 
         for group in [(model.swing1, model.stance1, model.swing3, model.stance3),
                       (model.swing3, model.stance3, model.swing1, model.stance1),
                       (model.swing2, model.stance2, model.swing4, model.stance4),
                       (model.swing4, model.stance4, model.swing2, model.stance2)]:
             swing_left, stance_left, swing_right, stance_right = group
-            nengo.Connection(swing_left, swing_right,
-                             function=lambda x:
-                             tau * (1 - x) * params["sw_sw_con_new"],
-                             synapse=tau
-                             )
-
-            nengo.Connection(swing_left, stance_right,
-                             function=lambda x:
-                             tau * (1 - x) * params["sw_st_con_new"],
-                             synapse=tau
-                             )
-
-            nengo.Connection(stance_left, swing_right,
-                             function=lambda x:
-                             tau * (1 - x) * params["st_sw_con_new"],
-                             synapse=tau
-                             )
-
-            nengo.Connection(stance_left, stance_right,
-                             function=lambda x:
-                             tau * (1 - x) * params["st_st_con_new"],
-                             synapse=tau
-                             )
+            coupling(swing_left, swing_right, "sw_sw_con_new")
+            coupling(swing_left, stance_right, "sw_st_con_new")
+            coupling(stance_left, swing_right, "st_sw_con_new")
+            coupling(stance_left, stance_right, "st_st_con_new")
 
         def create_switcher(leg, swing, stance, init="swing"):
             """
@@ -261,17 +475,22 @@ def create_CPG(*, params, time, state_neurons=400, **args):
             nengo.Connection(start_signal, s, synapse=tau)
 
             nengo.Connection(s, swing.neurons,
-                             function=positive_signal, synapse=tau
+                             function=positive_signal,
+                             transform=np.full((swing.n_neurons, 1), -100),
+                             synapse=tau
                              )
             nengo.Connection(s, stance.neurons,
-                             function=negative_signal, synapse=tau
+                             function=negative_signal,
+                             transform=np.full((stance.n_neurons, 1), -100),
+                             synapse=tau
                              )
 
             thresh_pos = nengo.Ensemble(1, 1, intercepts=[0.4], max_rates=[400],
                                         encoders=[[1]], label=f"thresh_pos{leg}"
                                         )
-            nengo.Connection(swing[0], thresh_pos,
-                             function=lambda x: x - 0.5, synapse=tau
+            nengo.Connection(swing, thresh_pos,
+                             synapse=tau,
+                             **decoding(swing, threshold, "threshold")
                              )
             nengo.Connection(thresh_pos, s,
                              transform=[100], synapse=tau
@@ -279,8 +498,9 @@ def create_CPG(*, params, time, state_neurons=400, **args):
             thresh_neg = nengo.Ensemble(1, 1, intercepts=[0.4], max_rates=[400],
                                         encoders=[[1]], label=f"thresh_neg{leg}"
                                         )
-            nengo.Connection(stance[0], thresh_neg,
-                             function=lambda x: x - 0.5, synapse=tau
+            nengo.Connection(stance, thresh_neg,
+                             synapse=tau,
+                             **decoding(stance, threshold, "threshold")
                              )
             nengo.Connection(thresh_neg, s,
                              transform=[-100], synapse=tau
@@ -316,64 +536,51 @@ def create_CPG(*, params, time, state_neurons=400, **args):
         nengo.Connection(init_stance, model.stance2[0], synapse=tau)
         nengo.Connection(init_stance, model.stance4[0], synapse=tau)
 
-        # User could provide it's own function for speed
+        # User could provide speed profile, it's own function for speed
         # or it will for from 0 to 1 in "time" seconds
-        if "speed_f" in args:
+        if mutable:
+            model.speed_input = ScheduleInput(1)
+            model.speed = nengo.Node(model.speed_input, label="speed")
+        elif "speed_profile" in args:
+            model.speed = nengo.Node(speed_output(args["speed_profile"], time), label="speed")
+        elif "speed_f" in args:
             model.speed = nengo.Node(args["speed_f"], label="speed")
         elif "vis" in args:
             model.speed = nengo.Node([0], label="speed")
         else:
-            model.speed = nengo.Node(lambda t: t / time, label="speed")
-
-        nengo.Connection(model.speed, model.swing1,
-                         function=lambda speed:
-                         tau * speed * params["speed_swing"],
-                         synapse=tau
-                         )
-
-        nengo.Connection(model.speed, model.swing2,
-                         function=lambda speed:
-                         tau * speed * params["speed_swing"],
-                         synapse=tau
-                         )
-
-        nengo.Connection(model.speed, model.stance1,
-                         function=lambda speed:
-                         tau * speed * params["speed_stance"],
-                         synapse=tau
-                         )
-
-        nengo.Connection(model.speed, model.stance2,
-                         function=lambda speed:
-                         tau * speed * params["speed_stance"],
+            model.speed = nengo.Node(speed_output(ramp(), time), label="speed")
+
+        # Speed influence tau * speed * params[speed_phase] is linear,
+        # so it is applied to all state ensembles by one filtered connection
+        speed_gains = [[tau * params["speed_swing" if "swing" in name else "speed_stance"]]
+                       for name in ensemble_names]
+        model.speed_drive = nengo.Node(size_in=len(ensemble_names), label="speed_drive")
+        nengo.Connection(model.speed, model.speed_drive,
+                         transform=speed_gains,
                          synapse=tau
                          )
-
+        for i, name in enumerate(ensemble_names):
+            nengo.Connection(model.speed_drive[i], getattr(model, name), synapse=None)
         #########################################################################
-        nengo.Connection(model.speed, model.swing3,
-                         function=lambda speed:
-                         tau * speed * params["speed_swing"],
-                         synapse=tau
-                         )
 
-        nengo.Connection(model.speed, model.swing4,
-                         function=lambda speed:
-                         tau * speed * params["speed_swing"],
-                         synapse=tau
-                         )
+        # Declarative damage schedule is precomputed into a table,
+        # every step only looks up the current row
+        if mutable:
+            model.damage_input = ScheduleInput(len(ensemble_names) * state_neurons)
+            model.damage = nengo.Node(model.damage_input, label="damage")
+        elif "damage" in args:
+            model.damage = nengo.Node(schedule_process(args["damage"], state_neurons),
+                                      label="damage"
+                                      )
 
-        nengo.Connection(model.speed, model.stance3,
-                         function=lambda speed:
-                         tau * speed * params["speed_stance"],
-                         synapse=tau
-                         )
-
-        nengo.Connection(model.speed, model.stance4,
-                         function=lambda speed:
-                         tau * speed * params["speed_stance"],
-                         synapse=tau
-                         )
-        #########################################################################
+        if mutable or "damage" in args:
+            for i, name in enumerate(ensemble_names):
+                # Damage of lesioned neurons has nowhere to go
+                alive = np.setdiff1d(np.arange(state_neurons), lesioned.get(name, []))
+                nengo.Connection(model.damage[list(i * state_neurons + alive)],
+                                 getattr(model, name).neurons,
+                                 synapse=None
+                                 )
 
         # A user could provide a damage function
         # which will inhibit some state neurons depending on the conditions
@@ -386,7 +593,7 @@ def create_CPG(*, params, time, state_neurons=400, **args):
             def dmg_f(disable_count, phase):
                 neuron_signal = np.zeros(state_neurons)
 
-                for i in range(int(disable_count)):
+                for i in range(int(disable_count[0])):
                     neuron_signal[i] = -30
 
                 return neuron_signal
@@ -404,28 +611,47 @@ def create_CPG(*, params, time, state_neurons=400, **args):
             is_damage = True
 
         if is_damage:
-            nengo.Connection(data_source,
-                             model.swing1.neurons,
-                             function=partial(dmg_f, phase="swing1"),
-                             synapse=None
-                             )
+            def alive_damage(x, phase, alive):
+                # Signals of lesioned neurons are dropped, as in the damage schedule
+                return np.asarray(dmg_f(x, phase=phase))[alive]
+
+            for name in ("swing1", "stance1", "swing2", "stance2"):
+                alive = np.setdiff1d(np.arange(state_neurons), lesioned.get(name, []))
+                nengo.Connection(data_source,
+                                 getattr(model, name).neurons,
+                                 function=partial(alive_damage, phase=name, alive=alive),
+                                 synapse=None
+                                 )
 
-            nengo.Connection(data_source,
-                             model.stance1.neurons,
-                             function=partial(dmg_f, phase="stance1"),
-                             synapse=None
-                             )
+    return model
 
-            nengo.Connection(data_source,
-                             model.swing2.neurons,
-                             function=partial(dmg_f, phase="swing2"),
-                             synapse=None
-                             )
 
-            nengo.Connection(data_source,
-                             model.stance2.neurons,
-                             function=partial(dmg_f, phase="stance2"),
-                             synapse=None
-                             )
+def create_CPG_batch(configs, *, time, state_neurons=400, seed=42, **args):
+    """
+    Functions puts independent copies of CPG model into one network,
+    so they could be simulated by one simulator
 
-    return model
+    Parameters
+    ----------
+    configs : list of dicts
+        create_CPG arguments for every copy, for example
+        params, speed_f or dmg_f
+    time : int
+        Duration of simulation
+    state_neurons : int
+        Number of neurons in state ensembles of every copy
+    seed : int
+        Seed of batch network, copies take their seeds from configs
+    Other keyword arguments are passed to create_CPG for all copies
+    Returns
+    -------
+    Nengo network, models of copies are in "instances" list
+    """
+    batch = nengo.Network(seed=seed, label="CPG batch")
+    with batch:
+        batch.instances = [
+            create_CPG(time=time, state_neurons=state_neurons, **dict(args, **config))
+            for config in configs
+        ]
+
+    return batch
@@ -0,0 +1,151 @@
+import numpy as np
+from nengo.processes import Piecewise
+
+"""
+Current injected into disabled state neurons,
+it keeps LIF neurons silent for any state input
+"""
+DAMAGE_CURRENT = -30
+
+"""
+State ensembles of create_CPG in the order of damage input dimensions
+"""
+ensemble_names = [f"{phase}{limb}" for limb in range(1, 5)
+                  for phase in ("swing", "stance")]
+
+
+def select_ensembles(phase="all", limbs=(1, 2, 3, 4)):
+    """
+    Function returns names of damaged ensembles
+    phase is "swing", "stance", "all" or an ensemble name like "stance2"
+    """
+    return [name for name in ensemble_names
+            if int(name[-1]) in limbs and (phase == "all" or phase in name)]
+
+
+def neuron_indices(neurons):
+    """
+    Function converts count of first neurons or list of indices to index array
+    """
+    if np.isscalar(neurons):
+        return np.arange(neurons)
+
+    return np.asarray(neurons, dtype=int)
+
+
+def static_lesion(neurons, phase="all", limbs=(1, 2, 3, 4)):
+    """
+    Function describes lesion that lasts for the whole simulation
+    Returns lesioned_neurons argument of create_CPG
+    """
+    indices = neuron_indices(neurons).tolist()
+
+    return {name: indices for name in select_ensembles(phase, limbs)}
+
+
+def lesion(neurons, phase="all", limbs=(1, 2, 3, 4), onset=0, offset=None,
+           ramp=0, current=DAMAGE_CURRENT):
+    """
+    Function describes one damage event of a schedule
+
+    Parameters
+    ----------
+    neurons : int or list
+        Number of first neurons or indices of neurons to disable
+        in every selected ensemble, neurons are disabled in this order
+    phase, limbs :
+        Damaged ensembles, see select_ensembles
+    onset : float
+        Time when damage starts
+    offset : float, optional
+        Time when all neurons recover, damage lasts to the end by default
+    ramp : float
+        Duration of linear growth of disabled neurons count,
+        from zero to all neurons, starting at onset
+    current : float
+        Current injected into disabled neurons
+    Returns
+    -------
+    Dictionary, schedule is a list of them
+    """
+    return {
+        "neurons": neurons if np.isscalar(neurons) else list(neurons),
+        "ensembles": select_ensembles(phase, limbs),
+        "onset": onset,
+        "offset": offset,
+        "ramp": ramp,
+        "current": current,
+    }
+
+
+def applies(event, time):
+    """
+    Function checks if damage event disables any neuron
+    during simulation of given duration
+    """
+    count = event["neurons"] if np.isscalar(event["neurons"]) else len(event["neurons"])
+    offset = event["offset"]
+
+    return count > 0 and len(event["ensembles"]) > 0 and event["onset"] < time \
+        and (offset is None or offset > event["onset"])
+
+
+def disabled_counts(event):
+    """
+    Function returns change points of one event
+    as list of (time, number of disabled neurons)
+    """
+    count = event["neurons"] if np.isscalar(event["neurons"]) else len(event["neurons"])
+    onset, ramp = event["onset"], event["ramp"]
+
+    if ramp > 0 and count > 0:
+        # Like int(t / ramp * count), next neuron is disabled
+        # every ramp / count seconds
+        points = [(onset + ramp * k / count, k) for k in range(1, count + 1)]
+    else:
+        points = [(onset, count)]
+
+    if event["offset"] is not None:
+        points = [(t, k) for t, k in points if t < event["offset"]]
+        points.append((event["offset"], 0))
+
+    return points
+
+
+def schedule_table(schedule, state_neurons):
+    """
+    Function compiles damage schedule into change point times and
+    concatenated input currents of all state ensembles in ensemble_names order
+    """
+    schedule = [schedule] if isinstance(schedule, dict) else schedule
+    events = [(event, dict(disabled_counts(event))) for event in schedule]
+
+    change_points = sorted({t for _, points in events for t in points})
+    if not change_points or change_points[0] > 0:
+        change_points.insert(0, 0)
+
+    state = [0] * len(events)
+    values = []
+    for t in change_points:
+        current = np.zeros((len(ensemble_names), state_neurons))
+        for i, (event, points) in enumerate(events):
+            state[i] = points.get(t, state[i])
+            indices = neuron_indices(event["neurons"])
+            rows = [ensemble_names.index(name) for name in event["ensembles"]]
+            current[np.ix_(rows, indices[:state[i]])] = event["current"]
+
+        values.append(current.ravel())
+
+    return np.array(change_points, dtype=float), np.array(values)
+
+
+def schedule_process(schedule, state_neurons):
+    """
+    Function compiles damage schedule into piecewise constant process
+    The output is concatenated input currents of all state ensembles
+    in ensemble_names order, it changes only at event change points,
+    schedule is evaluated once here and every step is an array lookup
+    """
+    times, values = schedule_table(schedule, state_neurons)
+
+    return Piecewise(dict(zip(times, values)))
@@ -0,0 +1,106 @@
+import nengo
+import numpy as np
+
+"""
+Events kept by GaitEventDetector by default, about 50 minutes of walking
+of four limbs with one second cycles
+"""
+CAPACITY = 4096 * 6
+
+
+class GaitEventDetector(nengo.Process):
+    """
+    Process that watches switcher states of all limbs during simulation
+    and records their swing and stance transitions, it has no output
+    Transitions go to a ring buffer of the last "capacity" events and time of
+    every limb in swing while another limb stands is summed every step, so
+    memory does not depend on simulation time
+    Every kept event also keeps the sums at its sample, so after old events are
+    dropped swing overlaps are still summed over the samples of kept ones
+    Transitions are found the same way as phase_events finds them in
+    history, detected data is in self.state dictionary shared with the built
+    simulator and is cleared when simulator is reset
+    """
+
+    def __init__(self, limbs=4, capacity=CAPACITY, **kwargs):
+        self.capacity = capacity
+        self.state = {}
+        super().__init__(default_size_in=limbs, default_size_out=0, **kwargs)
+
+    def make_step(self, shape_in, shape_out, dt, rng, state):
+        limbs = shape_in[0]
+        data = self.state
+        data.update(
+            samples=0,
+            events=0,
+            index=np.zeros(self.capacity, dtype=np.int64),
+            limb=np.zeros(self.capacity, dtype=np.int8),
+            to_swing=np.zeros(self.capacity, dtype=bool),
+            overlap=np.zeros((limbs, limbs), dtype=np.int64),
+            swing_time=np.zeros(limbs, dtype=np.int64),
+            overlap_at=np.zeros((self.capacity, limbs, limbs), dtype=np.int64),
+            swing_time_at=np.zeros((self.capacity, limbs), dtype=np.int64),
+        )
+        index, limb, to_swing = data["index"], data["limb"], data["to_swing"]
+        overlap, swing_time = data["overlap"], data["swing_time"]
+        overlap_at, swing_time_at = data["overlap_at"], data["swing_time_at"]
+        previous = np.zeros(limbs, dtype=bool)
+
+        def step_detector(t, x):
+            swing = x < 0
+            samples = data["samples"]
+
+            if samples > 0:
+                # Transition between samples i and i + 1 has index i
+                for changed in np.flatnonzero(swing != previous):
+                    position = data["events"] % self.capacity
+                    index[position] = samples - 1
+                    limb[position] = changed
+                    to_swing[position] = swing[changed]
+                    overlap_at[position] = overlap
+                    swing_time_at[position] = swing_time
+                    data["events"] += 1
+
+            previous[:] = swing
+            overlap[swing] += x > 0
+            swing_time[:] += swing
+            data["samples"] = samples + 1
+
+        return step_detector
+
+    def transitions(self):
+        """
+        Function returns kept transitions in the format of phase_events:
+        lists of stance->swing and swing->stance indices of every limb
+        """
+        data = self.state
+        kept = min(data["events"], self.capacity)
+        # Oldest kept event is the next one to be overwritten
+        order = (data["events"] - kept + np.arange(kept)) % self.capacity
+
+        index, limb, to_swing = data["index"][order], data["limb"][order], data["to_swing"][order]
+        limbs = len(data["swing_time"])
+
+        return [index[(limb == i) & to_swing] for i in range(limbs)], \
+            [index[(limb == i) & ~to_swing] for i in range(limbs)]
+
+    def dropped(self):
+        """
+        Returns number of the oldest transitions overwritten in the ring buffer
+        """
+        return max(self.state["events"] - self.capacity, 0)
+
+    def overlaps(self):
+        """
+        Function returns (limb x limb) matrix of samples when one limb swings
+        and another stands and swing samples of every limb, summed over
+        all samples or from the oldest kept transition when some were dropped
+        """
+        data = self.state
+        if not self.dropped():
+            return data["overlap"], data["swing_time"]
+
+        oldest = data["events"] % self.capacity
+
+        return data["overlap"] - data["overlap_at"][oldest], \
+            data["swing_time"] - data["swing_time_at"][oldest]
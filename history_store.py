@@ -0,0 +1,94 @@
+import json
+import os
+
+import numpy as np
+
+"""
+Simulation history is stored as (time, series) array in .npy file
+and JSON sidecar with column names, cycle lists and metadata
+"""
+
+
+def history_paths(name):
+    """
+    Returns array and sidecar paths for history name without extension
+    """
+    name = os.path.splitext(name)[0] if name.endswith((".npy", ".json")) else name
+    return f"{name}.npy", f"{name}.json"
+
+
+def split_history(history):
+    """
+    Function separates time series from other history entries
+    Every array as long as switcher history is a time series,
+    everything else goes to the sidecar
+    """
+    length = len(history["s1_state"]) if "s1_state" in history else \
+        max(len(v) for v in history.values() if isinstance(v, np.ndarray))
+
+    series, extra = {}, {}
+    for name, value in history.items():
+        if isinstance(value, np.ndarray) and len(value) == length and value.size == length:
+            series[name] = value.reshape(-1)
+        else:
+            extra[name] = value.tolist() if isinstance(value, np.ndarray) else value
+
+    return series, extra
+
+
+def create(name, columns, length, dtype=np.float32):
+    """
+    Function creates on-disk history array of given length,
+    it is filled in chunks through returned memory map
+    """
+    array_path, _ = history_paths(name)
+
+    return np.lib.format.open_memmap(array_path, mode="w+", dtype=dtype,
+                                     shape=(length, len(columns))
+                                     )
+
+
+def save_sidecar(name, columns, extra=None, **meta):
+    """
+    Function writes column names, non-series entries and metadata
+    """
+    _, sidecar_path = history_paths(name)
+    with open(sidecar_path, "w") as f:
+        json.dump({"columns": columns, "meta": meta, "extra": extra or {}}, f, indent=4)
+
+
+def save(name, history, dtype=np.float32, **meta):
+    """
+    Function saves simulation history
+    Probe histories become columns of one .npy array, cycle lists and other
+    values are stored in the sidecar together with keyword metadata (dt, params ...)
+    """
+    series, extra = split_history(history)
+
+    columns = list(series)
+    data = create(name, columns, len(series[columns[0]]), dtype)
+    for i, column in enumerate(columns):
+        data[:, i] = series[column]
+    data.flush()
+
+    save_sidecar(name, columns, extra, **meta)
+
+
+def load(name, mmap=True):
+    """
+    Function loads simulation history saved by save
+    With mmap=True time series are memory-mapped columns, so a window
+    slice like history["swing1_state"][16000:20000] reads only those rows
+    Returns history dictionary, metadata is under "meta" key
+    """
+    array_path, sidecar_path = history_paths(name)
+    with open(sidecar_path) as f:
+        sidecar = json.load(f)
+
+    data = np.load(array_path, mmap_mode="r" if mmap else None)
+
+    history = {column: data[:, i] for i, column in enumerate(sidecar["columns"])}
+    history.update(sidecar["extra"])
+    history["meta"] = sidecar["meta"]
+
+    return history
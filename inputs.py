@@ -0,0 +1,34 @@
+import nengo
+import numpy as np
+
+
+class ScheduleInput(nengo.Process):
+    """
+    Piecewise constant input whose schedule can be replaced after the build
+    Values are applied the same way as nengo Piecewise with zero interpolation,
+    new schedule takes effect when simulator is reset
+    """
+
+    def __init__(self, size_out, **kwargs):
+        # Dictionary is shared with the built simulator, so it stays mutable
+        self.schedule = {"times": np.zeros(1), "values": np.zeros((1, size_out))}
+        super().__init__(default_size_in=0, default_size_out=size_out, **kwargs)
+
+    def set(self, times, values):
+        """
+        Function replaces schedule, values[i] is output from times[i]
+        until the next time, output is zero before the first time
+        """
+        self.schedule["times"] = np.asarray(times, dtype=float)
+        self.schedule["values"] = np.asarray(values, dtype=float).reshape(len(times),
+                                                                          self.default_size_out)
+
+    def make_step(self, shape_in, shape_out, dt, rng, state):
+        times, values = self.schedule["times"], self.schedule["values"]
+        zeros = np.zeros(shape_out)
+
+        def step_schedule(t):
+            i = np.searchsorted(times, t + 0.5 * dt) - 1
+            return values[i] if i >= 0 else zeros
+
+        return step_schedule
@@ -0,0 +1,225 @@
+import numpy as np
+
+"""
+Time between history samples of simulator with default step
+"""
+DT = 0.001
+
+
+def rmse(expected, actual):
+    """
+    Function computes root-mean-square error of two arrays
+    Raises ValueError for empty arrays like sklearn mean_squared_error
+    """
+    expected, actual = np.asarray(expected, dtype=float), np.asarray(actual, dtype=float)
+    if expected.size == 0:
+        raise ValueError("Found array with 0 sample(s)")
+
+    return np.sqrt(np.mean((expected - actual) ** 2))
+
+
+def blocks_rmse(counts, expected, actual):
+    """
+    Function computes root-mean-square error of every block
+    of concatenated values, counts are lengths of consecutive blocks
+    Raises ValueError for blocks without values like rmse
+    """
+    if len(counts) == 0 or np.min(counts) == 0:
+        raise ValueError("Found array with 0 sample(s)")
+
+    blocks = np.repeat(np.arange(len(counts)), counts)
+
+    return np.sqrt(np.bincount(blocks, (expected - actual) ** 2) / counts)
+
+
+def r2_score(expected, actual):
+    """
+    Function computes coefficient of determination of actual values,
+    constant expected values give 1 for exact match and 0 otherwise, like sklearn
+    """
+    expected, actual = np.asarray(expected, dtype=float), np.asarray(actual, dtype=float)
+    residual = np.sum((expected - actual) ** 2)
+    total = np.sum((expected - np.mean(expected)) ** 2)
+
+    if total == 0:
+        return 1. if residual == 0 else 0.
+
+    return 1 - residual / total
+
+
+def ranks(values):
+    """
+    Function ranks values starting from 1, tied values get their average rank
+    """
+    values = np.asarray(values, dtype=float)
+    order = np.argsort(values, kind="stable")
+    sorted_values = values[order]
+
+    starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+    counts = np.diff(np.r_[starts, len(values)])
+    group_ranks = starts + (counts + 1) / 2
+
+    result = np.empty(len(values))
+    result[order] = np.repeat(group_ranks, counts)
+
+    return result
+
+
+def spearman(a, b):
+    """
+    Function computes Spearman rank correlation of two arrays,
+    it is NaN when one of them is constant
+    """
+    a_ranks, b_ranks = ranks(a), ranks(b)
+    a_ranks -= a_ranks.mean()
+    b_ranks -= b_ranks.mean()
+    norm = np.sqrt(np.sum(a_ranks ** 2) * np.sum(b_ranks ** 2))
+
+    return np.sum(a_ranks * b_ranks) / norm if norm > 0 else np.nan
+
+
+def cycle_to_swing(cycle):
+    """
+    Calculates expected swing phase duration given cycle duration
+    as present in Halbertsma cats dataset
+    """
+    return 0.168 + 0.0938 * cycle
+
+
+def cycle_to_stance(cycle):
+    """
+    Calculates expected stance phase duration given cycle duration
+    as present in Halbertsma cats dataset
+    """
+    return -0.168 + 0.9062 * cycle
+
+
+def phase_durations(swing_cycles, stance_cycles, dt=DT):
+    """
+    Function converts (n, 2) boundaries of swing and stance cycles
+    into durations in seconds
+    Returns swing, stance and whole cycle durations
+    """
+    swing_cycles = np.asarray(swing_cycles).reshape(-1, 2)
+    stance_cycles = np.asarray(stance_cycles).reshape(-1, 2)
+
+    swing = (swing_cycles[:, 1] - swing_cycles[:, 0]) * dt
+    stance = (stance_cycles[:, 1] - stance_cycles[:, 0]) * dt
+
+    return swing, stance, swing + stance
+
+
+def phase_regression(swing_cycles, stance_cycles, dt=DT):
+    """
+    Function compares simulated phase durations with Halbertsma
+    linear relationship of phase and cycle durations
+    Returns dictionary of durations, expected durations, RMSE and R2
+    of swing and stance
+    """
+    swing, stance, combined = phase_durations(swing_cycles, stance_cycles, dt)
+    swing_expected, stance_expected = cycle_to_swing(combined), cycle_to_stance(combined)
+
+    return {
+        "cycle": combined,
+        "swing": swing,
+        "stance": stance,
+        "swing_expected": swing_expected,
+        "stance_expected": stance_expected,
+        "swing_rmse": rmse(swing_expected, swing),
+        "stance_rmse": rmse(stance_expected, stance),
+        "swing_r2": r2_score(swing_expected, swing),
+        "stance_r2": r2_score(stance_expected, stance),
+    }
+
+
+def swing_offsets(swing_cycles, stance_cycles, dt=DT):
+    """
+    Function computes time from stance start to swing start and
+    from swing end to stance end for paired cycles of two limbs,
+    extra cycles of the longer list are ignored
+    """
+    swing_cycles = np.asarray(swing_cycles).reshape(-1, 2)
+    stance_cycles = np.asarray(stance_cycles).reshape(-1, 2)
+    n = min(len(swing_cycles), len(stance_cycles))
+
+    pre_swing = np.abs(swing_cycles[:n, 0] - stance_cycles[:n, 0]) * dt
+    post_swing = np.abs(stance_cycles[:n, 1] - swing_cycles[:n, 1]) * dt
+
+    return pre_swing, post_swing
+
+
+def gait_spectrum(states, pairs, dt=DT, window=5, step=1, resolution=0.01,
+                  min_period=0.3, max_period=3):
+    """
+    Function estimates rhythm of every limb and phase lags of limb pairs
+    in sliding windows with autocorrelation and spectra computed by FFT
+
+    Parameters
+    ----------
+    states : array
+        Switcher history, (time x limb) or (batch x time x limb)
+    pairs : list of (lead, lag) column pairs
+        Limbs whose phase lag is measured
+    dt : float
+        Time between history samples
+    window, step : float
+        Length and shift of windows in seconds
+    resolution : float
+        History is decimated to this step before FFT, cycles are much longer
+    min_period, max_period : float
+        Range of periods searched in autocorrelation
+    Returns
+    -------
+    Dictionary of arrays with windows on the axis before the last one:
+    "period" in seconds, "rhythm" autocorrelation at the period clipped to [0, 1]
+    and "swing" fraction of swing samples of every limb,
+    "lag" phase of lag limb behind lead limb as a fraction of cycle for every pair
+    """
+    states = np.asarray(states, dtype=float)
+    decimate = max(int(round(resolution / dt)), 1)
+    states, dt = states[..., ::decimate, :], dt * decimate
+
+    n = int(round(window / dt))
+    if states.shape[-2] < n:
+        raise ValueError("History is shorter than one window")
+
+    # (..., window, limb, sample) view of the history
+    windows = np.lib.stride_tricks.sliding_window_view(states, n, axis=-2)
+    windows = windows[..., ::max(int(round(step / dt)), 1), :, :]
+
+    swing = np.mean(windows < 0, axis=-1)
+    centered = windows - windows.mean(axis=-1, keepdims=True)
+    n_fft = 2 ** int(np.ceil(np.log2(2 * n)))
+
+    # Unbiased autocorrelation normalized by variance, flat windows have none
+    power = np.abs(np.fft.rfft(centered, n_fft)) ** 2
+    autocorrelation = np.fft.irfft(power, n_fft)[..., :n] / (n - np.arange(n))
+    variance = autocorrelation[..., :1]
+    autocorrelation = np.divide(autocorrelation, variance,
+                                out=np.zeros_like(autocorrelation), where=variance > 1e-12)
+
+    first, last = int(round(min_period / dt)), min(int(round(max_period / dt)), n - 2)
+    peak = first + np.argmax(autocorrelation[..., first:last + 1], axis=-1)
+    left, middle, right = [np.take_along_axis(autocorrelation, (peak + shift)[..., None], -1)[..., 0]
+                           for shift in (-1, 0, 1)]
+
+    # Parabola through the peak and its neighbours gives continuous period
+    curvature = left - 2 * middle + right
+    offset = np.divide(0.5 * (left - right), curvature,
+                       out=np.zeros_like(curvature), where=curvature < 0)
+    period = (peak + offset) * dt
+
+    # Phase difference at the frequency bin of the mean period of a pair
+    spectrum = np.fft.rfft(centered * np.hanning(n), n_fft)
+    lead, lag = np.array(pairs).T
+    pair_period = 0.5 * (period[..., lead] + period[..., lag])
+    frequency_bin = np.clip(np.round(n_fft * dt / pair_period).astype(int), 1, n_fft // 2)[..., None]
+    cross = np.take_along_axis(spectrum[..., lead, :], frequency_bin, -1)[..., 0] * \
+        np.conj(np.take_along_axis(spectrum[..., lag, :], frequency_bin, -1)[..., 0])
+
+    return {
+        "period": period,
+        "rhythm": np.clip(middle, 0, 1),
+        "swing": swing,
+        "lag": np.mod(np.angle(cross) / (2 * np.pi), 1),
+    }
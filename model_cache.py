@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+
+import cloudpickle
+import nengo
+import numpy as np
+from nengo.cache import NoDecoderCache
+
+"""
+Built models are stored next to the sources by default,
+CPG_CACHE_DIR environment variable overrides the location
+"""
+CACHE_DIR = os.environ.get(
+        "CPG_CACHE_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cpg_cache")
+)
+
+"""
+Maximum size of the cache directory in bytes,
+least recently used models are removed above it
+"""
+CACHE_SIZE = 2 * 1024 ** 3
+
+"""
+Modules that build the model, cached models of their older code are not reused
+"""
+MODEL_SOURCES = ["cpg.py", "damage.py", "speed.py", "inputs.py"]
+
+
+def source_hash(sources=MODEL_SOURCES):
+    """
+    Returns hash of contents of model source files
+    """
+    h = hashlib.sha1()
+    for name in sources:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), "rb") as f:
+            h.update(f.read())
+
+    return h.hexdigest()
+
+
+"""
+Pickled models are valid only for the library versions and model code
+that wrote them, so they are part of every key
+"""
+VERSIONS = {
+    "nengo": nengo.__version__,
+    "numpy": np.__version__,
+    "cloudpickle": cloudpickle.__version__,
+    "model": source_hash(),
+}
+
+# Counters are kept per process
+stats = {"hits": 0, "misses": 0}
+
+
+def config_key(**config):
+    """
+    Function computes content address of model configuration
+    Plain values are hashed as sorted json, callables (speed_f, dmg_f)
+    are hashed by their pickled code and closure, VERSIONS are always hashed
+    """
+    h = hashlib.sha1(json.dumps(VERSIONS, sort_keys=True).encode())
+    for name in sorted(config):
+        value = config[name]
+        h.update(name.encode())
+        try:
+            h.update(json.dumps(value, sort_keys=True).encode())
+        except TypeError:
+            h.update(cloudpickle.dumps(value))
+
+    return h.hexdigest()
+
+
+def cache_path(key, cache_dir=None):
+    return os.path.join(cache_dir or CACHE_DIR, f"{key}.pkl")
+
+
+def load(key, progress_bar=False, cache_dir=None):
+    """
+    Function creates simulator from cached built model
+    Returns (simulator, probes) or None on a cache miss,
+    file that could not be unpickled is removed
+    Cached model is already optimized, so neither the builder
+    nor the op-merge optimizer runs on a hit
+    Every hit simulates the same stored operators, a fresh build may merge
+    them in another order and differ slightly, see create_CPG seed
+    """
+    path = cache_path(key, cache_dir)
+    try:
+        with open(path, "rb") as f:
+            model, probes, seed = cloudpickle.load(f)
+    except OSError:
+        stats["misses"] += 1
+        return None
+    except (EOFError, AttributeError, ImportError, TypeError, ValueError,
+            cloudpickle.pickle.UnpicklingError):
+        # Truncated file or model pickled by other code is rebuilt
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        stats["misses"] += 1
+        return None
+
+    # Access time is used for LRU eviction
+    os.utime(path)
+    stats["hits"] += 1
+
+    sim = nengo.Simulator(None, model=model, seed=seed,
+                          progress_bar=progress_bar, optimize=False
+                          )
+    return sim, probes
+
+
+def store(key, sim, probes, seed, cache_dir=None):
+    """
+    Function saves built model of a fresh simulator with its probes
+    Should be called before the simulation starts
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Decoder cache holds file handles and is not needed after the build
+    decoder_cache = sim.model.decoder_cache
+    sim.model.decoder_cache = NoDecoderCache()
+    try:
+        data = cloudpickle.dumps((sim.model, probes, seed))
+    finally:
+        sim.model.decoder_cache = decoder_cache
+
+    path = cache_path(key, cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+    evict(cache_dir)
+
+
+def evict(cache_dir=None, size=None):
+    """
+    Function removes least recently used models
+    until the cache fits into size limit
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    size = CACHE_SIZE if size is None else size
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".pkl"):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(e[1] for e in entries)
+    for _, file_size, path in sorted(entries):
+        if total <= size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= file_size
+
+
+def cache_stats():
+    """
+    Returns hit and miss counters of the current process
+    """
+    return dict(stats)
@@ -0,0 +1,163 @@
+import json
+import math
+import time
+
+import numpy as np
+
+import metrics
+from optimize import SCORING_PROBES, rate_simulation_error, simulation_error
+import sweep
+
+"""
+Fidelity tiers from the cheapest one to the reference one
+Rate tier integrates model equations with numpy for all candidates at once,
+other tiers are simulation_error arguments: fewer non-spiking state neurons
+and shorter speed ramp for screening and default model for the last tier
+"""
+TIERS = [
+    {"name": "rate", "rate": True, "time": 80},
+    {"name": "small", "state_neurons": 100, "time": 40, "neuron_type": "LIFRate"},
+    {"name": "full", "state_neurons": 300, "time": 80},
+]
+
+"""
+Losses recorded for every candidate in every tier
+"""
+LOSSES = ["error", "error_phase", "error_speed", "error_symmetricity1", "error_symmetricity2"]
+
+
+def sample_candidates(bounds, n, seed=42):
+    """
+    Function samples parameter sets uniformly from {name: (low, high)} bounds
+    """
+    rng = np.random.RandomState(seed)
+    values = {name: rng.uniform(low, high, n) for name, (low, high) in bounds.items()}
+
+    return [{name: float(values[name][i]) for name in bounds} for i in range(n)]
+
+
+def tier_settings(tier):
+    """
+    Returns simulation_error arguments of tier dictionary
+    """
+    return {key: value for key, value in tier.items() if key not in ("name", "rate")}
+
+
+def tier_trial(params, settings):
+    """
+    Function scores one candidate in spiking tier, it is sweep function,
+    settings are simulation_error arguments of the tier
+    """
+    _, *losses = simulation_error(params, probes=SCORING_PROBES, dtype=np.float32,
+                                  **settings
+                                  )
+
+    return dict(zip(LOSSES, map(float, losses)))
+
+
+def evaluate_tier(candidates, tier, name, processes=None, progress=True):
+    """
+    Function scores candidates in a tier
+    Rate tier is one batch of rate model, spiking tiers run as resumable
+    sweep stored in "{name}_{tier}.jsonl"
+    Returns list of loss dictionaries in the order of candidates
+    """
+    if tier.get("rate"):
+        results = rate_simulation_error(candidates, **tier_settings(tier))
+        return [dict(zip(LOSSES, map(float, losses))) for _, *losses in results]
+
+    # Settings are part of points, so changed tiers do not reuse old results
+    points = [{"params": params, "settings": tier_settings(tier)} for params in candidates]
+    records = sweep.run_sweep(tier_trial, points, f"{name}_{tier['name']}.jsonl",
+                              processes=processes, progress=progress)
+
+    return [record["result"] for record in records]
+
+
+def agreement(lower, higher, keep):
+    """
+    Function compares errors of the same candidates in two tiers
+    Returns dictionary with number of candidates, Spearman rank correlation
+    and share of "keep" best candidates of higher tier that lower tier also
+    ranks among its "keep" best
+    """
+    lower, higher = np.asarray(lower), np.asarray(higher)
+    keep = min(keep, len(lower))
+    best_lower = set(np.argsort(lower, kind="stable")[:keep])
+    best_higher = set(np.argsort(higher, kind="stable")[:keep])
+
+    return {
+        "candidates": len(lower),
+        "spearman": float(metrics.spearman(lower, higher)),
+        "top_overlap": len(best_lower & best_higher) / keep if keep else float("nan"),
+    }
+
+
+def successive_halving(candidates, tiers=TIERS, keep=0.25, audit=2, name="multi_fidelity",
+                       processes=None, seed=42, progress=True):
+    """
+    Function screens candidates with cheap tiers and promotes only
+    the best of them to the next tier
+
+    Parameters
+    ----------
+    candidates : list of dicts
+        CPG parameter sets
+    tiers : list of dicts
+        Fidelity tiers from the cheapest one, see TIERS
+    keep : float
+        Share of candidates promoted from every tier
+    audit : int
+        Number of randomly chosen candidates that are promoted in addition
+        to the best ones, so agreement of tiers is measured not only
+        on candidates both tiers consider good
+    name : str
+        Prefix of result files, spiking tiers are resumable sweeps
+        and report is written to "{name}.json"
+    Returns
+    -------
+    Report dictionary: losses of evaluated candidates in every tier,
+    agreement of consecutive tiers, seconds per candidate of every tier,
+    best candidate of the last tier and its losses
+    """
+    rng = np.random.RandomState(seed)
+    active = np.arange(len(candidates))
+    report = {"tiers": [], "agreement": []}
+    errors = []
+
+    for k, tier in enumerate(tiers):
+        start = time.perf_counter()
+        results = evaluate_tier([candidates[i] for i in active], tier, name, processes, progress)
+        seconds = time.perf_counter() - start
+
+        tier_errors = {int(i): result for i, result in zip(active, results)}
+        errors.append(tier_errors)
+        report["tiers"].append({"name": tier["name"], "candidates": len(active),
+                                "seconds_per_candidate": seconds / len(active),
+                                "results": tier_errors})
+
+        if k > 0:
+            common = list(tier_errors)
+            report["agreement"].append(dict(
+                    agreement([errors[k - 1][i]["error"] for i in common],
+                              [tier_errors[i]["error"] for i in common],
+                              max(1, math.ceil(keep * len(common)))),
+                    lower=tiers[k - 1]["name"], higher=tier["name"]
+            ))
+
+        if k == len(tiers) - 1:
+            break
+
+        order = active[np.argsort([tier_errors[int(i)]["error"] for i in active], kind="stable")]
+        n_keep = max(1, math.ceil(keep * len(order)))
+        rest = order[n_keep:]
+        audited = rng.choice(rest, min(audit, len(rest)), replace=False)
+        active = np.sort(np.concatenate([order[:n_keep], audited]))
+
+    best = min(errors[-1], key=lambda i: errors[-1][i]["error"])
+    report["best"] = {"params": candidates[best], **errors[-1][best]}
+
+    with open(f"{name}.json", "w") as f:
+        json.dump(report, f, indent=4)
+
+    return report
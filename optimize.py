@@ -1,12 +1,18 @@
+import io
+import warnings
+
 import numpy as np
-from sklearn.metrics import mean_squared_error
 import nengo
 
-try:
-    import nengo_ocl
-except:
-    print("Warning: can't import nengo_ocl. Using CPU")
-from cpg import create_CPG
+from cpg import create_CPG, create_CPG_batch
+from gait_events import CAPACITY, GaitEventDetector
+from damage import schedule_table
+from speed import canonical, ramp, speed_schedule
+import history_store
+from metrics import blocks_rmse, cycle_to_stance, cycle_to_swing, \
+    gait_spectrum, phase_durations, rmse, swing_offsets
+import model_cache
+from rate_model import rate_simulation
 
 tau = 0.01
 
@@ -14,90 +20,113 @@ tau = 0.01
 # Minimum and maximum ranges for cat cycle duration
 MIN_PHASE, MAX_PHASE = (.57, 1.91)
 
+# Value of every loss when gait can not be evaluated
+PENALTY = 10
 
-def findall(p, s):
-    """Yields all the positions of
-    the pattern p in the string s."""
-    i = s.find(p)
-    r = []
-    while i != -1:
-        r.append(i)
-        i = s.find(p, i + 1)
-    return r
+# Simulator step, histories are sampled with it unless probes are decimated
+DT = 0.001
 
+# Histories scoring functions need
+SCORING_PROBES = ["s1_state", "s2_state", "s3_state", "s4_state"]
 
-def calc_swing_stance(state_probe):
+# Autocorrelation at the period of spectral scoring windows,
+# below RHYTHM_FLOOR window has no rhythm, above RHYTHM_FULL it is fully rhythmic
+RHYTHM_FLOOR, RHYTHM_FULL = 0.2, 0.5
+
+# Coupled (lead, lag) limbs of SCORING_PROBES columns:
+# front and hind left-right pairs, left and right front-hind pairs
+QUADRUPED_PAIRS = [(0, 1), (3, 2), (0, 3), (1, 2)]
+
+# Simulators built by this process for reused_simulation_error
+reusable_simulators = {}
+
+# Snapshots of shared simulation prefixes, oldest are dropped above the limit
+prefix_snapshots = {}
+PREFIX_SNAPSHOTS = 32
+
+
+def phase_events(states):
     """
-    Function detects starts and ends for swing and stance phases
-    using findall function
-    giving state changes history
+    Function detects switcher sign changes for every limb at once
+    Returns two lists of int arrays (one array per limb column):
+    indices of stance->swing and swing->stance transitions
     """
-    s1_state_changes = state_probe < 0
+    states = np.asarray(states)
+    if states.ndim == 1:
+        states = states[:, None]
 
-    state_str = "".join([str(int(s)) for s in s1_state_changes])
+    swing = states < 0
 
-    stance_swing = findall("01", state_str)
-    swing_stance = findall("10", state_str)
+    stance_swing = ~swing[:-1] & swing[1:]
+    swing_stance = swing[:-1] & ~swing[1:]
 
-    swing_cycles = []
-    stance_cycles = []
+    # Transposed nonzero gives indices sorted by limb and then by time
+    limbs_sw, times_sw = np.nonzero(stance_swing.T)
+    limbs_st, times_st = np.nonzero(swing_stance.T)
 
-    for start_swing in stance_swing:
-        start_stance_i = np.searchsorted(swing_stance, start_swing)
-        if start_stance_i >= len(swing_stance):
-            break
-        start_stance = swing_stance[start_stance_i]
+    limbs = np.arange(states.shape[1] + 1)
+    split_sw = np.searchsorted(limbs_sw, limbs)[1:-1]
+    split_st = np.searchsorted(limbs_st, limbs)[1:-1]
 
-        end_stance_i = np.searchsorted(stance_swing, start_stance)
-        if end_stance_i >= len(stance_swing):
-            end_stance = len(state_probe)
-        else:
-            end_stance = stance_swing[end_stance_i]
+    return np.split(times_sw, split_sw), np.split(times_st, split_st)
 
-        swing_cycles.append((start_swing, start_stance))
-        stance_cycles.append((start_stance, end_stance))
+
+def pair_cycles(stance_swing, swing_stance, length):
+    """
+    Function pairs transitions of one limb into swing and stance cycles
+    Every swing starts at stance->swing transition and lasts until the next swing->stance
+    transition, stance lasts until the next stance->swing transition or the end of history
+    Returns (n, 2) int arrays of cycle boundaries without the first and the last cycle
+    """
+    start_stance_i = np.searchsorted(swing_stance, stance_swing)
+
+    # Swing without following stance stops pairing
+    start_swing = stance_swing[start_stance_i < len(swing_stance)]
+    start_stance = swing_stance[start_stance_i[:len(start_swing)]]
+
+    end_stance_i = np.searchsorted(stance_swing, start_stance)
+    end_stance = np.append(stance_swing, length)[end_stance_i]
+
+    swing_cycles = np.stack([start_swing, start_stance], axis=1).astype(int)
+    stance_cycles = np.stack([start_stance, end_stance], axis=1).astype(int)
 
     return swing_cycles[1:-1], stance_cycles[1:-1]
 
 
-def cycle_to_swing(cycle):
+def calc_swing_stance(state_probe):
     """
-    Calculates expected swing phase duration given cycle duration
-    as present in Halbertsma cats dataset
+    Function detects starts and ends for swing and stance phases
+    using sign changes of the switcher state history
+    Returns (n, 2) int arrays of swing and stance cycles
     """
-    return 0.168 + 0.0938 * cycle
+    (stance_swing,), (swing_stance,) = phase_events(np.asarray(state_probe).reshape(-1, 1))
+
+    return pair_cycles(stance_swing, swing_stance, len(state_probe))
 
 
-def cycle_to_stance(cycle):
+def calc_swing_stance_limbs(states):
     """
-    Calculates expected stance phase duration given cycle duration
-    as present in Halbertsma cats dataset
+    Function detects swing and stance cycles for (time x limb) history
+    in one call, returns list of (swing_cycles, stance_cycles) per limb
     """
-    return -0.168 + 0.9062 * cycle
+    stance_swing, swing_stance = phase_events(states)
+
+    return [pair_cycles(sw, st, len(states))
+            for sw, st in zip(stance_swing, swing_stance)]
 
 
-def single_limb_error(swing_cycles, stance_cycles):
+def single_limb_error(swing_cycles, stance_cycles, dt=DT):
     """
     Function computers phase duration loss for one limb
     by calculating root-mean-square error of expected phase durations and simulated phases
     Our goal to reproduce the same linear relationship present in Halbertsma dataset
+    dt is time between history samples
     """
-    swing_cycles_duration = [(right - left) / 1000
-                             for left, right in swing_cycles]
-
-    stance_cycles_duration = [(right - left) / 1000
-                              for left, right in stance_cycles]
-
-    combined_cycles = np.array(swing_cycles_duration) + np.array(stance_cycles_duration)
+    swing_cycles_duration, stance_cycles_duration, combined_cycles = \
+        phase_durations(swing_cycles, stance_cycles, dt)
 
-    swing_expected = cycle_to_swing(combined_cycles)
-    stance_expected = cycle_to_stance(combined_cycles)
-    err_swing = mean_squared_error(swing_expected,
-                                   swing_cycles_duration, squared=False
-                                   )
-    err_stance = mean_squared_error(stance_expected,
-                                    stance_cycles_duration, squared=False
-                                    )
+    err_swing = rmse(cycle_to_swing(combined_cycles), swing_cycles_duration)
+    err_stance = rmse(cycle_to_stance(combined_cycles), stance_cycles_duration)
     error_phase = err_swing + err_stance
 
     error_speed = abs(MIN_PHASE - min(combined_cycles)) + \
@@ -106,205 +135,758 @@ def single_limb_error(swing_cycles, stance_cycles):
     return error_phase, error_speed
 
 
-def symmetry_error(swing_cycles, stance_cycles):
+def symmetry_error(swing_cycles, stance_cycles, dt=DT):
     """
     Function checks if swing phase of a limb is in the middle of stance phase in other limb
     """
-    pre_swing_part = [abs(swing[0] - stance[0]) / 1000
-                      for swing, stance in zip(swing_cycles, stance_cycles)]
+    pre_swing_part, post_swing_part = swing_offsets(swing_cycles, stance_cycles, dt)
+
+    return rmse(pre_swing_part, post_swing_part)
+
+
+# History names and model attributes of all probes
+PROBE_TARGETS = {
+    "s1_state": "s1",
+    "s2_state": "s2",
+    "s3_state": "s3",
+    "s4_state": "s4",
+    "speed_state": "speed",
+
+    "swing1_state": "swing1",
+    "stance1_state": "stance1",
+    "swing2_state": "swing2",
+    "stance2_state": "stance2",
+
+    ############################################################
+    "swing3_state": "swing3",
+    "stance3_state": "stance3",
+    "swing4_state": "swing4",
+    "stance4_state": "stance4",
+    ############################################################
+}
+
+
+def add_probes(model, probes=None, sample_every=None):
+    """
+    Function adds filtered probes for switchers, speed and state ensembles
+    probes is list of history names to record, all of them by default,
+    with sample_every probes keep one sample per that many seconds
+    Returns dictionary of probes with simulation history names
+    """
+    names = PROBE_TARGETS if probes is None else probes
+    with model:
+        return {name: nengo.Probe(getattr(model, PROBE_TARGETS[name]),
+                                  synapse=tau, sample_every=sample_every
+                                  )
+                for name in names}
+
+
+def probe_history(sim, probes, dtype=None):
+    """
+    Function collects probe data into history dictionary,
+    optionally converted to dtype, float32 halves the memory
+    """
+    if dtype is None:
+        return {name: sim.data[probe] for name, probe in probes.items()}
+
+    return {name: sim.data[probe].astype(dtype) for name, probe in probes.items()}
+
+
+def history_dt(sim, sample_every=None):
+    """
+    Returns time between history samples
+    """
+    return sim.dt if sample_every is None else sample_every
+
+
+def build_simulator(params, time=80, progress_bar=False, state_neurons=300,
+                    cache=False, probes=None, sample_every=None, **args):
+    """
+    Function creates CPG model with probes and builds nengo simulator
+    With cache=True built model is taken from or saved to model_cache,
+    key covers all arguments of create_CPG and probes
+    Cache hits of one stored model are identical, but op-merge order changes
+    between builds, so a hit is not bit-identical to a fresh build
+    Returns simulator and dictionary of probes
+    """
+    if cache:
+        key = model_cache.config_key(params=params, time=time,
+                                     state_neurons=state_neurons,
+                                     probes=probes, sample_every=sample_every, **args
+                                     )
+        cached = model_cache.load(key, progress_bar=progress_bar)
+        if cached is not None:
+            return cached
+
+    model = create_CPG(params=params, state_neurons=state_neurons, time=time, **args)
+    probes = add_probes(model, probes, sample_every)
 
-    post_swing_part = [abs(stance[1] - swing[1]) / 1000
-                       for swing, stance in zip(swing_cycles, stance_cycles)]
+    sim = nengo.Simulator(model, progress_bar=progress_bar, optimize=True)
 
-    error = mean_squared_error(pre_swing_part, post_swing_part, squared=False)
+    if cache:
+        model_cache.store(key, sim, probes, seed=sim.seed)
 
-    return error
+    return sim, probes
 
 
-def simulation(params, time=80, progress_bar=False, state_neurons=300, **args):
+def simulation(params, time=80, progress_bar=False, state_neurons=300,
+               dtype=None, **args):
     """
     Function creates CPG model given parameters and run simulation
+    probes, sample_every and dtype select what history keeps
     Returns dictionary for simulation history
     """
-    model = create_CPG(params=params, state_neurons=state_neurons, time=time, **args)
+    sim, probes = build_simulator(params, time, progress_bar,
+                                  state_neurons=state_neurons, **args
+                                  )
+    with sim:
+        sim.run(time)
 
-    with model:
-        s1_probe = nengo.Probe(model.s1, synapse=tau)
-        s2_probe = nengo.Probe(model.s2, synapse=tau)
-        s3_probe = nengo.Probe(model.s3, synapse=tau)
-        s4_probe = nengo.Probe(model.s4, synapse=tau)
-        speed_probe = nengo.Probe(model.speed, synapse=tau)
-
-        swing1_probe = nengo.Probe(model.swing1, synapse=tau)
-        stance1_probe = nengo.Probe(model.stance1, synapse=tau)
-        swing2_probe = nengo.Probe(model.swing2, synapse=tau)
-        stance2_probe = nengo.Probe(model.stance2, synapse=tau)
-
-        ############################################################
-        swing3_probe = nengo.Probe(model.swing3, synapse=tau)
-        stance3_probe = nengo.Probe(model.stance3, synapse=tau)
-        swing4_probe = nengo.Probe(model.swing4, synapse=tau)
-        stance4_probe = nengo.Probe(model.stance4, synapse=tau)
-        ############################################################
+    return probe_history(sim, probes, dtype)
 
-    with nengo.Simulator(model, progress_bar=progress_bar, optimize=True) as sim:
+
+def simulation_batch(configs, time=80, progress_bar=False, state_neurons=300,
+                     probes=None, sample_every=None, dtype=None, **args):
+    """
+    Function simulates independent CPG models in one simulator
+    configs is list of create_CPG arguments for each model (params, speed_profile, damage ...),
+    other keyword arguments are common for all models
+    Returns list of simulation histories in the order of configs
+    """
+    batch = create_CPG_batch(configs, time=time, state_neurons=state_neurons, **args)
+    instance_probes = [add_probes(model, probes, sample_every)
+                       for model in batch.instances]
+
+    with nengo.Simulator(batch, progress_bar=progress_bar, optimize=True) as sim:
         sim.run(time)
 
-    return {
-        "s1_state": sim.data[s1_probe],
-        "s2_state": sim.data[s2_probe],
-        "s3_state": sim.data[s3_probe],
-        "s4_state": sim.data[s4_probe],
-        "speed_state": sim.data[speed_probe],
-        "swing1_state": sim.data[swing1_probe],
-        "stance1_state": sim.data[stance1_probe],
-        "swing2_state": sim.data[swing2_probe],
-        "stance2_state": sim.data[stance2_probe],
-        "swing3_state": sim.data[swing3_probe],
-        "stance3_state": sim.data[stance3_probe],
-        "swing4_state": sim.data[swing4_probe],
-        "stance4_state": sim.data[stance4_probe],
-    }
+    return [probe_history(sim, model_probes, dtype) for model_probes in instance_probes]
 
 
-def simulation_error(params, time=80, progress_bar=False, state_neurons=300, **args):
+def simulation_batch_error(configs, time=80, progress_bar=False, state_neurons=300,
+                           probes=None, sample_every=None, **args):
     """
-    Function runs simulation and combines all losses into final value
+    Function runs batch simulation and scores every model
+    Returns list of the same tuples as simulation_error
     """
-    history = simulation(params, time, progress_bar, state_neurons=state_neurons, **args)
+    histories = simulation_batch(configs, time, progress_bar,
+                                 state_neurons=state_neurons,
+                                 probes=scoring_probes(probes),
+                                 sample_every=sample_every, **args
+                                 )
 
-    s1_state = history["s1_state"]
-    s2_state = history["s2_state"]
-    s3_state = history["s3_state"]
-    s4_state = history["s4_state"]
+    return [(history, *history_error(history, dt=sample_every or DT))
+            for history in histories]
 
-    try:
-        sw_cycles1_l, st_cycles1_l = calc_swing_stance(s1_state)
-        sw_cycles2_r, st_cycles2_r = calc_swing_stance(s2_state)
-        sw_cycles3_r, st_cycles3_r = calc_swing_stance(s3_state)
-        sw_cycles4_l, st_cycles4_l = calc_swing_stance(s4_state)
 
-        ########################################################
+def scoring_probes(probes):
+    """
+    Function adds histories needed for scoring to probes whitelist
+    """
+    if probes is None:
+        return None
+
+    return list(probes) + [name for name in SCORING_PROBES if name not in probes]
 
-        error_phase1_l, error_speed1_l = single_limb_error(sw_cycles1_l, st_cycles1_l)
-        error_phase2_r, error_speed2_r = single_limb_error(sw_cycles2_r, st_cycles2_r)
-        error_phase3_r, error_speed3_r = single_limb_error(sw_cycles3_r, st_cycles3_r)
-        error_phase4_l, error_speed4_l = single_limb_error(sw_cycles4_l, st_cycles4_l)
 
-        #######################################################################################################
+def run_windows(sim, probes, time, window, dtype=None):
+    """
+    Function advances simulator to "time" in windows of "window" seconds
+    Yields simulated time and history collected so far after every window
+    """
+    steps = int(round(time / sim.dt))
+    window_steps = max(int(round(window / sim.dt)), 1)
 
-        error_phase1 = error_phase1_l + error_phase2_r
-        error_phase2 = error_phase4_l + error_phase3_r
+    while sim.n_steps < steps:
+        sim.run_steps(min(window_steps, steps - sim.n_steps))
+        yield sim.time, probe_history(sim, probes, dtype)
 
-        error_speed1 = error_speed1_l + error_speed2_r
-        error_speed2 = error_speed4_l + error_speed3_r
 
-        error_phase = error_phase1 + error_phase2
-        error_speed = error_speed1 + error_speed2
+def probe_samples(steps, dt, sample_every=None):
+    """
+    Returns number of samples probe keeps during "steps" simulation steps,
+    nengo keeps sample of step n when n % period < 1, every interval
+    [k * period, k * period + 1) holds exactly one such step,
+    so steps 1 ... steps keep steps // period samples
+    """
+    period = 1 if sample_every is None else sample_every / dt
+    if period <= 1:
+        return steps
 
-        error_symmetricity_1_2 = symmetry_error(sw_cycles1_l[1:], st_cycles2_r)
-        error_symmetricity_2_1 = symmetry_error(sw_cycles2_r, st_cycles1_l[:-1])
+    # Float floor division is consistent with the % rule nengo applies
+    return int(steps // period)
 
-        error_symmetricity_4_3 = symmetry_error(sw_cycles4_l[1:], st_cycles3_r)
-        error_symmetricity_3_4 = symmetry_error(sw_cycles3_r, st_cycles4_l[:-1])
 
-        error_symmetricity_2_3 = symmetry_error(sw_cycles2_r[1:], st_cycles3_r)
-        error_symmetricity_3_2 = symmetry_error(sw_cycles3_r, st_cycles2_r[:-1])
+def simulation_stream(name, params, time=80, progress_bar=False, state_neurons=300,
+                      window=10, probes=None, sample_every=None, dtype=np.float32,
+                      events=True, **args):
+    """
+    Function runs long simulation with bounded memory
+    Simulator advances in windows of "window" seconds, probe data of every window
+    is written to history_store file "name" and cleared from the simulator
+    With events=True switcher transitions are found window by window and
+    swing and stance cycles are saved to the sidecar as s{i}_swing_cycles and s{i}_stance_cycles
+    Returns memory-mapped history loaded from the store
+    """
+    sim, probes = build_simulator(params, time, progress_bar,
+                                  state_neurons=state_neurons,
+                                  probes=scoring_probes(probes) if events else probes,
+                                  sample_every=sample_every, **args
+                                  )
+    dt = history_dt(sim, sample_every)
+    steps = int(round(time / sim.dt))
+
+    columns = list(probes)
+    store = history_store.create(name, columns, probe_samples(steps, sim.dt, sample_every), dtype)
+
+    switchers = [columns.index(name) for name in SCORING_PROBES] if events else []
+    stance_swing = [[] for _ in switchers]
+    swing_stance = [[] for _ in switchers]
+    last = None
+
+    written = 0
+    with sim:
+        for _ in run_windows(sim, {}, time, window):
+            chunk = np.hstack([sim.data[probes[column]] for column in columns])
+            store[written:written + len(chunk)] = chunk
+            sim.clear_probes()
+
+            if switchers:
+                # Previous sample catches transitions on the window border
+                states = chunk[:, switchers] if last is None else \
+                    np.vstack([last, chunk[:, switchers]])
+                shift = written if last is None else written - 1
+                for i, (sw, st) in enumerate(zip(*phase_events(states))):
+                    stance_swing[i].append(sw + shift)
+                    swing_stance[i].append(st + shift)
+                last = chunk[-1:, switchers]
+
+            written += len(chunk)
+
+    store.flush()
+    del store
+
+    extra = {}
+    for i in range(len(switchers)):
+        swing_cycles, stance_cycles = pair_cycles(np.concatenate(stance_swing[i]).astype(int),
+                                                  np.concatenate(swing_stance[i]).astype(int),
+                                                  written
+                                                  )
+        extra[f"s{i + 1}_swing_cycles"] = swing_cycles.tolist()
+        extra[f"s{i + 1}_stance_cycles"] = stance_cycles.tolist()
+
+    history_store.save_sidecar(name, columns, extra, dt=dt, time=time)
+
+    return history_store.load(name)
+
+
+def stalled_switchers(sim, probes, period, dt=DT):
+    """
+    Function checks switchers of running simulator for phase transitions
+    Only samples of the last "period" seconds are read from the probes,
+    so the check after every window does not depend on simulated time
+    Returns names of switchers that did not change sign during last "period" seconds
+    """
+    recent = int(round(period / dt))
+    names = [f"s{i}_state" for i in range(1, 5)]
+    swing = np.column_stack([np.concatenate(sim._sim_data[probes[name]][-recent:])
+                             for name in names]) < 0
 
-        error_symmetricity_1_4 = symmetry_error(sw_cycles1_l[1:], st_cycles4_l)
-        error_symmetricity_4_1 = symmetry_error(sw_cycles4_l, st_cycles1_l[:-1])
-        #############################################################################################################
+    changed = np.any(swing[1:] != swing[:-1], axis=0)
 
-        error_symmetricity1_front = error_symmetricity_1_2 + error_symmetricity_2_1
-        error_symmetricity1_hind = error_symmetricity_4_3 + error_symmetricity_3_4
+    return [name for name, c in zip(names, changed) if not c]
 
-        error_symmetricity1_2_left = error_symmetricity_1_4 + error_symmetricity_4_1
-        error_symmetricity1_2_right = error_symmetricity_2_3 + error_symmetricity_3_2
 
-        error_symmetricity1 = error_symmetricity1_front + error_symmetricity1_hind + \
-                              error_symmetricity1_2_left + error_symmetricity1_2_right
+def simulation_error(params, time=80, progress_bar=False, state_neurons=300,
+                     window=None, report=None, watchdog=None,
+                     probes=None, sample_every=None, dtype=None, metric="events", **args):
+    """
+    Function runs simulation and combines all losses into final value
+    With "window" simulation runs in chunks of that many seconds and
+    after each chunk report(sim_time, error, error_phase, error_speed,
+    error_symmetricity1, error_symmetricity2) receives losses for the history so far,
+    truthy return value from report stops simulation, without report
+    history is scored only once at the end
+    With "watchdog" simulation is aborted as soon as any switcher has no phase
+    transition for that many seconds, all losses get penalty value and
+    history["abort_reason"] describes the abort
+    probes whitelist always includes SCORING_PROBES, probes, sample_every
+    and dtype are the same as in simulation, metric is passed to history_error
+    """
+    probes = scoring_probes(probes)
+
+    if window is None and watchdog is None:
+        history = simulation(params, time, progress_bar, state_neurons=state_neurons,
+                             probes=probes, sample_every=sample_every, dtype=dtype, **args
+                             )
+
+        return (history, *history_error(history, dt=sample_every or DT, metric=metric))
+
+    if window is None:
+        window = min(watchdog, 1)
+
+    sim, probes = build_simulator(params, time, progress_bar,
+                                  state_neurons=state_neurons,
+                                  probes=probes, sample_every=sample_every, **args
+                                  )
+    dt = history_dt(sim, sample_every)
+    abort_reason, errors = None, None
+    with sim:
+        # History is collected only for report, it grows with simulated time
+        for sim_time, _ in run_windows(sim, {}, time, window):
+            if watchdog is not None and sim_time >= watchdog:
+                stalled = stalled_switchers(sim, probes, watchdog, dt)
+                if stalled:
+                    abort_reason = f"no phase transition in {', '.join(stalled)} " \
+                                   f"for {watchdog} s at {sim_time:.2f} s"
+                    errors = (total_error(PENALTY, PENALTY, PENALTY, PENALTY),
+                              PENALTY, PENALTY, PENALTY, PENALTY)
+                    if report is not None:
+                        report(sim_time, *errors)
+                    break
+
+            if report is not None:
+                errors = history_error(probe_history(sim, probes, dtype), verbose=False,
+                                       dt=dt, metric=metric
+                                       )
+                if report(sim_time, *errors):
+                    break
+
+    history = probe_history(sim, probes, dtype)
+    if abort_reason is not None:
+        history["abort_reason"] = abort_reason
+    # Losses reported after the last window are losses of the whole history
+    if errors is None:
+        errors = history_error(history, verbose=False, dt=dt, metric=metric)
+
+    return (history, *errors)
+
+
+def reusable_simulator(params, progress_bar=False, state_neurons=300,
+                       probes=None, sample_every=None, **args):
+    """
+    Function returns simulator of CPG model with mutable speed and damage inputs
+    It is built once per process for every model configuration and kept in
+    reusable_simulators, so sweep workers pay build and op-merge cost only once
+    Returns simulator, dictionary of probes, speed and damage input processes
+    """
+    key = model_cache.config_key(params=params, state_neurons=state_neurons,
+                                 probes=probes, sample_every=sample_every, **args
+                                 )
+    if key not in reusable_simulators:
+        # Time only matters for default speed, which mutable inputs replace
+        model = create_CPG(params=params, state_neurons=state_neurons, time=1,
+                           mutable_inputs=True, **args
+                           )
+        model_probes = add_probes(model, probes, sample_every)
+        sim = nengo.Simulator(model, progress_bar=progress_bar, optimize=True)
+        reusable_simulators[key] = (sim, model_probes, model.speed_input, model.damage_input)
+
+    return reusable_simulators[key]
+
+
+def simulator_snapshot(sim):
+    """
+    Function copies dynamic state of simulator: writable signals (neuron voltages,
+    synapse filter states, time and step counter) and probe data collected so far
+    Random generators of stochastic processes live inside their step functions
+    and are not copied, CPG model has no such processes
+    """
+    return {
+        "signals": [np.array(sim.signals[sig]) for sig in sim.signals if not sig.readonly],
+        "probes": [np.array(sim._sim_data[probe]) for probe in sim.model.probes],
+    }
 
-        swing1 = s1_state < 0
-        stance1 = s1_state > 0
 
-        swing2 = s2_state < 0
-        stance2 = s2_state > 0
+def restore_snapshot(sim, snapshot):
+    """
+    Function loads snapshot into simulator of the same built model
+    Step functions are kept, so inputs set before the last reset stay in effect
+    """
+    signals = [sig for sig in sim.signals if not sig.readonly]
+    if len(signals) != len(snapshot["signals"]) or \
+            any(sim.signals[sig].shape != value.shape
+                for sig, value in zip(signals, snapshot["signals"])):
+        raise ValueError("Snapshot was taken from another model")
 
-        ########################
-        swing3 = s3_state < 0
-        stance3 = s3_state > 0
+    for sig, value in zip(signals, snapshot["signals"]):
+        sim.signals[sig][...] = value
 
-        swing4 = s4_state < 0
-        stance4 = s4_state > 0
-        ########################
+    for probe, data in zip(sim.model.probes, snapshot["probes"]):
+        sim._sim_data[probe] = list(data)
+    sim.data.reset()
+    sim._probe_step_time()
 
-        sw1_in_st2 = np.sum(swing1 & stance2) / np.sum(swing1) # 1- time when 2 leg is swinging while 1 is swinging
-        sw2_in_st1 = np.sum(swing2 & stance1) / np.sum(swing2)
 
-        ################################################
-        sw2_in_st3 = np.sum(swing2 & stance3) / np.sum(swing2)
-        sw3_in_st2 = np.sum(swing3 & stance2) / np.sum(swing3)
+def pack_snapshot(snapshot):
+    """
+    Function compresses snapshot to bytes for sending to other processes
+    """
+    arrays = {f"s{i}": value for i, value in enumerate(snapshot["signals"])}
+    arrays.update({f"p{i}": value for i, value in enumerate(snapshot["probes"])})
 
-        sw1_in_st4 = np.sum(swing1 & stance4) / np.sum(swing1)
-        sw4_in_st1 = np.sum(swing4 & stance1) / np.sum(swing4)
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, n_signals=len(snapshot["signals"]),
+                        n_probes=len(snapshot["probes"]), **arrays
+                        )
+    return buffer.getvalue()
 
-        sw3_in_st4 = np.sum(swing3 & stance4) / np.sum(swing3)
-        sw4_in_st3 = np.sum(swing4 & stance3) / np.sum(swing4)
-        ################################################
 
-        error_symmetricity2 = (1 - sw1_in_st2) + (1 - sw2_in_st1) + (1 - sw3_in_st4) + (1 - sw4_in_st3) + \
-                              (1 - sw2_in_st3) + (1 - sw3_in_st2) + (1 - sw1_in_st4) + (1 - sw4_in_st1) 
+def unpack_snapshot(data):
+    """
+    Function restores snapshot compressed by pack_snapshot
+    """
+    with np.load(io.BytesIO(data)) as arrays:
+        return {
+            "signals": [arrays[f"s{i}"] for i in range(int(arrays["n_signals"]))],
+            "probes": [arrays[f"p{i}"] for i in range(int(arrays["n_probes"]))],
+        }
 
+
+def damage_free_prefix(damage_table, prefix, dt=DT):
+    """
+    Function checks that compiled damage schedule does not
+    inject any current into simulation steps before "prefix" seconds
+    """
+    times, values = damage_table
+    # Value from time T is applied from the step at T, see inputs.ScheduleInput
+    active = times < prefix - 0.5 * dt
+
+    return not np.any(values[active])
+
+
+def reused_simulation_error(params, time=80, progress_bar=False, state_neurons=300,
+                            speed_profile=None, damage=(), prefix=None, probes=None,
+                            sample_every=None, dtype=None, metric="events", **args):
+    """
+    Function runs simulation on reusable simulator of this process
+    Speed profile and damage schedule are loaded into its inputs, simulator
+    is reset and run, results are the same as of simulation_error with the same
+    speed_profile, damage and mutable_inputs=True
+    With "prefix" seconds, steps before that time are shared by all runs with
+    the same speed profile: they are simulated once, kept as snapshot and later
+    runs continue from it, damage must not start before the prefix ends
+    Returns the same tuple as simulation_error
+    """
+    sim, probes, speed_input, damage_input = reusable_simulator(
+            params, progress_bar, state_neurons,
+            probes=scoring_probes(probes), sample_every=sample_every, **args
+    )
+
+    damage_table = schedule_table(damage, state_neurons)
+    speed_input.set(*speed_schedule(speed_profile or ramp(), time))
+    damage_input.set(*damage_table)
+    sim.reset()
+
+    steps = int(round(time / sim.dt))
+    if prefix:
+        if not damage_free_prefix(damage_table, prefix, sim.dt):
+            raise ValueError(f"Damage starts before shared prefix of {prefix} s")
+
+        profile = canonical(speed_profile or ramp(), time)
+        key = (id(sim), model_cache.config_key(speed_profile=profile, time=time), prefix)
+        if key in prefix_snapshots:
+            restore_snapshot(sim, prefix_snapshots[key])
+        else:
+            sim.run_steps(int(round(prefix / sim.dt)) - 1, progress_bar=progress_bar)
+            prefix_snapshots[key] = simulator_snapshot(sim)
+            if len(prefix_snapshots) > PREFIX_SNAPSHOTS:
+                prefix_snapshots.pop(next(iter(prefix_snapshots)))
+
+    sim.run_steps(steps - sim.n_steps, progress_bar=progress_bar)
+
+    history = probe_history(sim, probes, dtype)
+
+    return (history, *history_error(history, dt=history_dt(sim, sample_every), metric=metric))
+
+
+def rate_simulation_error(params, time=80, probes=None, metric="events", **args):
+    """
+    Function scores a batch of parameter sets with numpy rate model
+    instead of spiking simulation
+    metric="spectral" scores all histories at once with spectral_gait_error
+    Returns list of the same tuples as simulation_error, one per parameter set
+    """
+    histories = rate_simulation(params, time, keys=scoring_probes(probes), **args)
+
+    if metric != "spectral":
+        return [(history, *history_error(history)) for history in histories]
+
+    states = np.stack([np.column_stack([history[name] for name in SCORING_PROBES])
+                       for history in histories])
+    try:
+        losses = spectral_gait_error(states)
     except Exception as e:
+        # History shorter than one window, the same penalty as history_error gives
         print("error calc", e)
-        error_phase = 10
-        error_speed = 10
-        error_symmetricity1 = 10
-        error_symmetricity2 = 10
+        losses = np.full((4, len(histories)), PENALTY)
+
+    return [(history, total_error(*errors), *errors) for history, *errors in zip(histories, *losses)]
 
-    error = 2 * error_phase + error_speed + \
-            error_symmetricity1 + 3 * error_symmetricity2
 
-    return history, error, error_phase, error_speed, error_symmetricity1, error_symmetricity2
+def add_detector(model, capacity=CAPACITY, limbs=SCORING_PROBES):
+    """
+    Function connects switchers to gait event detector node, switcher
+    states are filtered the same way probes filter them
+    Returns the detector process
+    """
+    detector = GaitEventDetector(len(limbs), capacity)
+    with model:
+        node = nengo.Node(detector, label="gait events")
+        for i, name in enumerate(limbs):
+            nengo.Connection(getattr(model, PROBE_TARGETS[name]), node[i], synapse=tau)
 
+    return detector
 
-def only_error(history, time=95):
-    eval_slice = int((time / 95) * len(history["s1_state"]))
-    s1_state = history["s1_state"][:eval_slice]
-    s2_state = history["s2_state"][:eval_slice]
 
+def online_simulation_error(params, time=80, progress_bar=False, state_neurons=300,
+                            capacity=CAPACITY, probes=(), **args):
+    """
+    Function runs simulation scored by gait event detector instead of
+    recorded switcher histories, memory depends on number of cycles and not
+    on simulation time, probes lists optional histories to record
+    Returns the same tuple as simulation_error, history has only the
+    optional probes, "gait_events" count of detected transitions and
+    "dropped_events" count of the oldest ones that did not fit into capacity
+    """
+    model = create_CPG(params=params, state_neurons=state_neurons, time=time, **args)
+    detector = add_detector(model, capacity)
+    probes = add_probes(model, probes)
+
+    with nengo.Simulator(model, progress_bar=progress_bar, optimize=True) as sim:
+        sim.run(time)
+
+    history = probe_history(sim, probes)
+    history["gait_events"] = detector.state["events"]
+    history["dropped_events"] = detector.dropped()
+
+    return (history, *detector_error(detector))
+
+
+def total_error(error_phase, error_speed, error_symmetricity1, error_symmetricity2):
+    """
+    Function combines all losses into final value
+    """
+    return 2 * error_phase + error_speed + \
+           error_symmetricity1 + 3 * error_symmetricity2
+
+
+def cycles_error(cycles, pairs=QUADRUPED_PAIRS, dt=DT):
+    """
+    Function computes phase, speed and swing timing losses from
+    list of (swing_cycles, stance_cycles) of every limb, see gait_error
+    Returns error_phase, error_speed, error_symmetricity1
+    """
+    swing_cycles = [swing for swing, _ in cycles]
+    stance_cycles = [stance for _, stance in cycles]
+
+    # Cycles of all limbs are concatenated, counts are cycles of every limb
+    counts = np.array([len(swing) for swing in swing_cycles])
+    swing, stance, combined = phase_durations(np.concatenate(swing_cycles),
+                                              np.concatenate(stance_cycles), dt)
+
+    error_phase = np.sum(blocks_rmse(counts, cycle_to_swing(combined), swing) +
+                         blocks_rmse(counts, cycle_to_stance(combined), stance))
+
+    starts = np.cumsum(counts) - counts
+    error_speed = np.sum(abs(MIN_PHASE - np.minimum.reduceat(combined, starts)) +
+                         abs(MAX_PHASE - np.maximum.reduceat(combined, starts)))
+
+    # Swing of lead limb from its second cycle against stance of lag limb,
+    # and swing of lag limb against stance of lead limb without its last cycle
+    terms = [(swing_cycles[lead][1:], stance_cycles[lag]) for lead, lag in pairs] + \
+            [(swing_cycles[lag], stance_cycles[lead][:-1]) for lead, lag in pairs]
+    terms = [(sw[:len(st)], st[:len(sw)]) for sw, st in terms]
+    pre_swing, post_swing = swing_offsets(np.concatenate([sw for sw, _ in terms]),
+                                          np.concatenate([st for _, st in terms]), dt)
+    error_symmetricity1 = np.sum(blocks_rmse(np.array([len(sw) for sw, _ in terms]),
+                                             pre_swing, post_swing))
+
+    return error_phase, error_speed, error_symmetricity1
+
+
+def overlap_error(overlap, swing_time, pairs=QUADRUPED_PAIRS):
+    """
+    Function computes swing overlap loss from (limb x limb) matrix of
+    samples when one limb swings and another stands and swing samples of every limb
+    """
+    swinging = np.array([lead for lead, _ in pairs] + [lag for _, lag in pairs])
+    standing = np.array([lag for _, lag in pairs] + [lead for lead, _ in pairs])
+    sw_in_st = overlap[swinging, standing] / swing_time[swinging]
+
+    return np.sum(1 - sw_in_st)
+
+
+def gait_error(states, pairs=QUADRUPED_PAIRS, dt=DT):
+    """
+    Function computes gait losses of (time x limb) switcher history
+    for any number of limbs in one pass over the history
+
+    Parameters
+    ----------
+    states : array
+        Switcher states, one column per limb
+    pairs : list of (lead, lag) column pairs
+        Coupled limbs, swing of every limb should be in the middle of stance
+        of the other one, lead limb starts the first counted cycle
+    dt : float
+        Time between history samples
+    Returns
+    -------
+    error_phase, error_speed, error_symmetricity1, error_symmetricity2
+    summed over limbs and pairs, the same terms single_limb_error and
+    symmetry_error compute for one limb or pair
+    """
+    states = np.asarray(states)
+
+    # Time every limb swings while another one stands, for all limb combinations
+    swing_mask = states < 0
+    stance_mask = states > 0
+    overlap = np.dot(swing_mask.T.astype(float), stance_mask.astype(float))
+
+    return (*cycles_error(calc_swing_stance_limbs(states), pairs, dt),
+            overlap_error(overlap, swing_mask.sum(axis=0), pairs))
+
+
+def detector_error(detector, verbose=True, pairs=QUADRUPED_PAIRS):
+    """
+    Function computes all losses from transitions and swing overlaps
+    collected by gait_events.GaitEventDetector during simulation,
+    they are the same as losses of the full history sampled every step
+    unless the detector dropped old events, then all losses cover
+    only the samples from the oldest kept transition and a warning is issued
+    Returns error, error_phase, error_speed, error_symmetricity1, error_symmetricity2
+    """
+    data = detector.state
+    if detector.dropped():
+        warnings.warn(f"Gait event detector dropped {detector.dropped()} of "
+                      f"{data['events']} transitions, losses cover only the last "
+                      f"{detector.capacity}, increase capacity")
     try:
-        left_sw_cycles, left_st_cycles = calc_swing_stance(s1_state)
-        right_sw_cycles, right_st_cycles = calc_swing_stance(s2_state)
+        cycles = [pair_cycles(stance_swing, swing_stance, data["samples"])
+                  for stance_swing, swing_stance in zip(*detector.transitions())]
 
-        error_left_phase, error_left_speed = single_limb_error(left_sw_cycles, left_st_cycles)
-        error_right_phase, error_right_speed = single_limb_error(right_sw_cycles, right_st_cycles)
+        error_phase, error_speed, error_symmetricity1 = cycles_error(cycles, pairs, DT)
+        error_symmetricity2 = overlap_error(*detector.overlaps(), pairs)
 
-        error_phase = error_left_phase + error_right_phase
-        error_speed = 0
+    except Exception as e:
+        if verbose:
+            print("error calc", e)
+        error_phase = PENALTY
+        error_speed = PENALTY
+        error_symmetricity1 = PENALTY
+        error_symmetricity2 = PENALTY
+
+    error = total_error(error_phase, error_speed,
+                        error_symmetricity1, error_symmetricity2)
+
+    return error, error_phase, error_speed, error_symmetricity1, error_symmetricity2
+
+
+def spectral_gait_error(states, pairs=QUADRUPED_PAIRS, dt=DT, **args):
+    """
+    Function computes smooth counterparts of gait_error losses from
+    windowed autocorrelation and spectra, see metrics.gait_spectrum,
+    keyword arguments set its windows
+    Phase loss is mean absolute difference of swing and stance durations from
+    Halbertsma relationship at the estimated period, speed loss uses the range of periods, symmetry losses
+    measure deviation of pair phase lags from antiphase in seconds and as
+    overlap of swings, every pair is counted twice as in gait_error
+    Windows are weighted by rhythmicity, see RHYTHM_FLOOR, and every loss is mixed with
+    PENALTY by the arrhythmic part of history, so broken gaits still get
+    graded losses and history without rhythm gets PENALTY
+    states is (time x limb) or (batch x time x limb) history
+    Returns error_phase, error_speed, error_symmetricity1, error_symmetricity2,
+    arrays for batch
+    """
+    spectrum = gait_spectrum(states, pairs, dt, **args)
+    period = spectrum["period"]
+    rhythm = np.clip((spectrum["rhythm"] - RHYTHM_FLOOR) / (RHYTHM_FULL - RHYTHM_FLOOR), 0, 1)
+    lead, lag = np.array(pairs).T
+
+    def mixed(losses, weights):
+        # Weighted mean over windows mixed with penalty share of every limb or pair
+        arrhythmic = 1 - np.mean(weights, axis=-2)
+        total = np.sum(weights, axis=-2)
+        mean = np.divide(np.sum(losses * weights, axis=-2), total,
+                         out=np.zeros_like(total), where=total > 0)
+        share = PENALTY / losses.shape[-1]
+
+        return np.sum((1 - arrhythmic) * np.minimum(mean, share) + arrhythmic * share, axis=-1)
+
+    swing_error = cycle_to_swing(period) - spectrum["swing"] * period
+    # Stance error has the same size, expected phases sum up to the cycle
+    error_phase = mixed(2 * np.abs(swing_error), rhythm)
+
+    # Period range of rhythmic windows, limbs without them get penalty share
+    rhythmic = rhythm > 0
+    shortest = np.min(np.where(rhythmic, period, np.inf), axis=-2)
+    longest = np.max(np.where(rhythmic, period, -np.inf), axis=-2)
+    share = PENALTY / period.shape[-1]
+    error_speed = np.sum(np.where(np.any(rhythmic, axis=-2),
+                                  np.minimum(abs(MIN_PHASE - shortest) + abs(MAX_PHASE - longest), share),
+                                  share), axis=-1)
+
+    pair_rhythm = np.sqrt(rhythm[..., lead] * rhythm[..., lag])
+    pair_period = 0.5 * (period[..., lead] + period[..., lag])
+    error_symmetricity1 = mixed(2 * np.abs(spectrum["lag"] - 0.5) * pair_period, pair_rhythm)
+    error_symmetricity2 = mixed(1 + np.cos(2 * np.pi * spectrum["lag"]), pair_rhythm)
+
+    return error_phase, error_speed, error_symmetricity1, error_symmetricity2
+
+
+def history_error(history, verbose=True, dt=DT, limbs=SCORING_PROBES, pairs=QUADRUPED_PAIRS,
+                  metric="events"):
+    """
+    Function computes all losses for simulation history
+    Partial histories are scored the same way, verbose=False hides
+    messages about histories without complete cycles
+    dt is time between history samples, limbs are switcher histories
+    in the order of columns of pairs, see gait_error
+    metric="spectral" scores history with spectral_gait_error instead
+    of detected phase transitions
+    Returns error, error_phase, error_speed, error_symmetricity1, error_symmetricity2
+    """
+    score = spectral_gait_error if metric == "spectral" else gait_error
 
-        error_symmetricity_l_r = symmetry_error(left_sw_cycles[1:], right_st_cycles)
-        error_symmetricity_r_l = symmetry_error(right_sw_cycles, left_st_cycles[:-1])
+    try:
+        error_phase, error_speed, error_symmetricity1, error_symmetricity2 = \
+            score(np.column_stack([history[name] for name in limbs]), pairs, dt)
 
-        error_symmetricity1 = error_symmetricity_l_r + error_symmetricity_r_l
+    except Exception as e:
+        if verbose:
+            print("error calc", e)
+        error_phase = PENALTY
+        error_speed = PENALTY
+        error_symmetricity1 = PENALTY
+        error_symmetricity2 = PENALTY
 
-        swing1 = s1_state < 0
-        stance1 = s1_state > 0
+    error = total_error(error_phase, error_speed,
+                        error_symmetricity1, error_symmetricity2)
 
-        swing2 = s2_state < 0
-        stance2 = s2_state > 0
+    return error, error_phase, error_speed, error_symmetricity1, error_symmetricity2
 
-        sw1_in_st2 = np.sum(swing1 & stance2) / np.sum(swing1)
-        sw2_in_st1 = np.sum(swing2 & stance1) / np.sum(swing2)
 
-        error_symmetricity2 = (1 - sw1_in_st2) + (1 - sw2_in_st1)
+def only_error(history, time=95):
+    """
+    Function scores first two limbs of the first "time" seconds of 95 s history,
+    speed range is not scored
+    """
+    eval_slice = int((time / 95) * len(history["s1_state"]))
+    states = np.column_stack([history["s1_state"][:eval_slice],
+                              history["s2_state"][:eval_slice]])
+
+    try:
+        error_phase, _, error_symmetricity1, error_symmetricity2 = \
+            gait_error(states, pairs=[(0, 1)])
+        error_speed = 0
 
     except Exception as e:
         print("error calc", e)
-        error_phase = 10
-        error_speed = 10
-        error_symmetricity1 = 10
-        error_symmetricity2 = 10
+        error_phase = PENALTY
+        error_speed = PENALTY
+        error_symmetricity1 = PENALTY
+        error_symmetricity2 = PENALTY
 
     error = 2 * error_phase + error_speed + \
             error_symmetricity1 + error_symmetricity2
@@ -1,13 +1,23 @@
 import os
+from functools import partial
+import numpy as np
 from ray import tune
 from ray.tune.search.hyperopt import HyperOptSearch
-from optimize import simulation_error
+from ray.tune.schedulers import ASHAScheduler
+from optimize import simulation_error, SCORING_PROBES
 import tune_optimize_utils as utils
 
 
 if __name__ == "__main__":
     os.environ["PYOPENCL_CTX"] = '0'
-    ray_simulation_error = utils.ray_wrapper(simulation_error)
+    # Partial errors are reported every 10 simulated seconds,
+    # ASHA stops trials that are behind after 20 seconds
+    # Only switcher histories are recorded, scoring does not need others
+    ray_simulation_error = utils.ray_wrapper(partial(simulation_error,
+                                                     probes=SCORING_PROBES,
+                                                     dtype=np.float32),
+                                             window=10)
+    scheduler = ASHAScheduler(time_attr="sim_time", max_t=80, grace_period=20)
 
     algo = HyperOptSearch(points_to_evaluate=utils.best_params)
     config = utils.search_space
@@ -16,6 +26,7 @@ if __name__ == "__main__":
         ray_simulation_error,
         name=utils.exp_name("Hyperout"),
         search_alg=algo,
+        scheduler=scheduler,
         metric="error",
         mode="min",
         num_samples=56,
@@ -0,0 +1,18 @@
+import multi_fidelity
+import tune_optimize_utils as utils
+
+
+if __name__ == "__main__":
+    # Candidates come from uniform ranges of tune search space,
+    # rate model screens all of them and only a quarter goes to every next tier
+    bounds = {name: (domain.lower, domain.upper)
+              for name, domain in utils.search_space.items()}
+    candidates = utils.best_params + multi_fidelity.sample_candidates(bounds, 255)
+
+    report = multi_fidelity.successive_halving(candidates, keep=0.25, audit=2,
+                                               name=utils.exp_name("MultiFidelity"))
+
+    for tier in report["agreement"]:
+        print(f"{tier['lower']} -> {tier['higher']}: spearman {tier['spearman']:.3f}, "
+              f"top overlap {tier['top_overlap']:.2f} on {tier['candidates']} candidates")
+    print("Best hyperparameters found were: ", report["best"])
@@ -0,0 +1,172 @@
+import numpy as np
+
+from speed import ramp, sample
+
+"""
+Rate model integrates the same equations that create_CPG implements
+with spiking ensembles, but directly with NumPy for a batch of parameters
+"""
+
+tau = 0.01
+
+"""
+Switcher threshold ensembles receive state - 0.5 and have intercept 0.4,
+so the active phase ends when its state reaches 0.9
+"""
+threshold = 0.5 + 0.4
+
+"""
+Switchers inhibit state neurons with -100 through synapse tau,
+neurons start firing again only when inhibition decays below release level
+"""
+inhibition = 100
+release = 1
+
+"""
+State can not leave the range ensembles are trained on
+"""
+state_range = (0, 1)
+
+"""
+Limbs that start in stance phase get init_stance_position
+as initial stance state, others start in swing from zero
+"""
+init_phase = ("swing", "stance", "swing", "stance")
+
+"""
+Coupling groups of create_CPG as (pre, post) limb pairs
+"""
+adjacent_limbs = [(1, 2), (1, 4), (2, 1), (2, 3), (3, 2), (3, 4), (4, 1), (4, 3)]
+diagonal_limbs = [(1, 3), (3, 1), (2, 4), (4, 2)]
+
+
+def coupling_matrix(pairs, limbs=4):
+    """
+    Function creates (post x pre) matrix summing inputs from coupled limbs
+    """
+    matrix = np.zeros((limbs, limbs))
+    for pre, post in pairs:
+        matrix[post - 1, pre - 1] = 1
+
+    return matrix
+
+
+def params_batch(params):
+    """
+    Function converts list of parameter dictionaries
+    to dictionary of (batch, 1) arrays
+    """
+    if isinstance(params, dict):
+        params = [params]
+
+    return {k: np.array([p[k] for p in params], dtype=float)[:, None]
+            for k in params[0]}
+
+
+def speed_input(time, dt=0.001, **args):
+    """
+    Function samples speed drive for every simulation step
+    the same way create_CPG does: speed profile, speed_f(t)
+    or linear change from 0 to 1
+    """
+    if "speed_profile" in args:
+        return sample(args["speed_profile"], time, dt)
+
+    if "speed_f" in args:
+        t = np.arange(1, int(round(time / dt)) + 1) * dt
+        return np.array([args["speed_f"](ti) for ti in t], dtype=float).ravel()
+
+    return sample(ramp(), time, dt)
+
+
+def rate_simulation(params, time=80, dt=0.001, keys=None, **args):
+    """
+    Function simulates rate model of four-limb CPG
+    for a batch of parameter sets at once
+
+    Parameters
+    ----------
+    params : dict or list of dicts
+        CPG model parameters as for create_CPG
+    time : int
+        Duration of simulation
+    dt : float
+        Integration step, matches nengo simulator step by default
+    keys : list, optional
+        History keys to record, all keys of optimize.simulation by default
+    Returns
+    -------
+    List of history dictionaries, one per parameter set, with (time, 1) arrays
+    filtered by the same synapse as nengo probes
+    """
+    p = params_batch(params)
+    batch = len(next(iter(p.values())))
+
+    adjacent = coupling_matrix(adjacent_limbs).T
+    diagonal = coupling_matrix(diagonal_limbs).T
+
+    speed = speed_input(time, dt, **args)
+    steps = len(speed)
+
+    # Switcher state -1 keeps swing active, 1 keeps stance active
+    s = np.array([-1. if phase == "swing" else 1. for phase in init_phase])
+    s = np.tile(s, (batch, 1))
+
+    swing = np.zeros((batch, 4))
+    stance = np.where(s > 0, p["init_stance_position"], 0.)
+
+    if keys is None:
+        keys = [f"s{i}_state" for i in range(1, 5)] + ["speed_state"] + \
+               [f"{phase}{i}_state" for i in range(1, 5) for phase in ("swing", "stance")]
+
+    swing_inhibition = np.where(s > 0, inhibition, 0.)
+    stance_inhibition = np.where(s < 0, inhibition, 0.)
+
+    records = {k: np.zeros((steps, batch)) for k in keys}
+    filtered = {k: np.zeros(batch) for k in keys}
+    decay = np.exp(-dt / tau)
+
+    for step in range(steps):
+        swing_inhibition = decay * swing_inhibition + (1 - decay) * inhibition * (s > 0)
+        stance_inhibition = decay * stance_inhibition + (1 - decay) * inhibition * (s < 0)
+        swing_active = swing_inhibition < release
+        stance_active = stance_inhibition < release
+
+        # Inhibited ensembles are silent, so they do not
+        # influence other limbs
+        swing_out = (1 - swing) * swing_active
+        stance_out = (1 - stance) * stance_active
+
+        sw_adj, st_adj = swing_out @ adjacent, stance_out @ adjacent
+        sw_diag, st_diag = swing_out @ diagonal, stance_out @ diagonal
+
+        d_swing = p["init_swing"] + p["inner_inhibit"] * swing + \
+                  p["speed_swing"] * speed[step] + \
+                  p["sw_sw_con"] * sw_adj + p["st_sw_con"] * st_adj + \
+                  p["sw_sw_con_new"] * sw_diag + p["st_sw_con_new"] * st_diag
+
+        d_stance = p["init_stance"] + p["inner_inhibit"] * stance + \
+                   p["speed_stance"] * speed[step] + \
+                   p["sw_st_con"] * sw_adj + p["st_st_con"] * st_adj + \
+                   p["sw_st_con_new"] * sw_diag + p["st_st_con_new"] * st_diag
+
+        swing = np.clip(swing + dt * d_swing, *state_range) * swing_active
+        stance = np.clip(stance + dt * d_stance, *state_range) * stance_active
+
+        to_stance = swing_active & (swing > threshold)
+        to_swing = stance_active & (stance > threshold)
+        s = np.where(to_stance, 1., np.where(to_swing, -1., s))
+        swing = swing * ~to_stance
+        stance = stance * ~to_swing
+
+        values = {"speed_state": speed[step]}
+        for i in range(4):
+            values[f"s{i + 1}_state"] = s[:, i]
+            values[f"swing{i + 1}_state"] = swing[:, i]
+            values[f"stance{i + 1}_state"] = stance[:, i]
+
+        for k in keys:
+            filtered[k] = decay * filtered[k] + (1 - decay) * values[k]
+            records[k][step] = filtered[k]
+
+    return [{k: records[k][:, b:b + 1] for k in keys} for b in range(batch)]
@@ -0,0 +1,189 @@
+import sqlite3
+
+import numpy as np
+
+import sweep
+
+"""
+Sweep results table, one row per simulation
+Rows are unique by KEY_COLUMNS, the index on them serves grid queries
+"""
+KEY_COLUMNS = ["disable_phase", "disable_count", "speed", "params_hash", "seed"]
+RESULT_COLUMNS = ["error", "error_phase", "error_speed",
+                  "error_symmetricity1", "error_symmetricity2", "seconds"]
+
+"""
+Speed value of simulations with default speed ramp instead of constant speed
+"""
+RAMP_SPEED = -1
+
+"""
+Damage phase of simulations without damage
+"""
+NO_DAMAGE = "none"
+
+
+def connect(path):
+    """
+    Function opens results database and creates table and indices if needed
+    """
+    conn = sqlite3.connect(path)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS results (
+            disable_phase TEXT NOT NULL,
+            disable_count INTEGER NOT NULL,
+            speed REAL NOT NULL,
+            params_hash TEXT NOT NULL,
+            seed INTEGER NOT NULL,
+            {", ".join(f"{column} REAL" for column in RESULT_COLUMNS)},
+            PRIMARY KEY ({", ".join(KEY_COLUMNS)})
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS results_speed ON results (speed, disable_count)")
+
+    return conn
+
+
+def params_hash(params):
+    """
+    Returns short identifier of CPG parameters
+    """
+    return sweep.point_key(params)[:16]
+
+
+def record_row(record, params=None):
+    """
+    Function converts sweep record to table row
+    Replicate index is used as seed for sweeps without explicit seeds
+    """
+    point, result = record["point"], record["result"]
+    row = {
+        "disable_phase": point.get("disable_phase", NO_DAMAGE),
+        "disable_count": point.get("disable_count", 0),
+        "speed": point.get("speed", RAMP_SPEED),
+        "params_hash": params_hash(point.get("params", params)),
+        "seed": point.get("seed", point.get("replicate", 0)),
+        "seconds": record.get("seconds"),
+    }
+    for column in RESULT_COLUMNS[:-1]:
+        row[column] = result.get(column)
+
+    return row
+
+
+def insert(conn, records, params=None):
+    """
+    Function adds sweep records to the table, rows with the same key are replaced
+    params identifies the model for records without "params" in their points
+    """
+    columns = KEY_COLUMNS + RESULT_COLUMNS
+    rows = [record_row(record, params) for record in records]
+    with conn:
+        conn.executemany(
+                f"INSERT OR REPLACE INTO results ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})",
+                [[row[column] for column in columns] for row in rows]
+        )
+
+
+def import_sweep(db_path, sweep_path, params=None):
+    """
+    Function copies results of sweep.run_sweep file into database
+    """
+    conn = connect(db_path)
+    insert(conn, sweep.load_results(sweep_path), params)
+
+    return conn
+
+
+def check_columns(*columns):
+    """
+    Function protects queries from unknown column names
+    """
+    for column in columns:
+        if column not in KEY_COLUMNS + RESULT_COLUMNS:
+            raise ValueError(f"Unknown column {column}")
+
+
+def where(filters):
+    """
+    Function builds WHERE clause for equality filters on table columns
+    """
+    check_columns(*filters)
+
+    if not filters:
+        return "", []
+
+    return "WHERE " + " AND ".join(f"{column} = ?" for column in filters), list(filters.values())
+
+
+def query_rows(conn, columns, **filters):
+    """
+    Function returns values of given columns for every matching row,
+    for statistics that need single replicates, like bootstrap intervals
+    Returns dictionary {column: list of values}
+    """
+    check_columns(*columns)
+    clause, args = where(filters)
+
+    rows = conn.execute(f"SELECT {', '.join(columns)} FROM results {clause}", args).fetchall()
+
+    return {column: [row[i] for row in rows] for i, column in enumerate(columns)}
+
+
+def query_grid(conn, value, rows, columns, **filters):
+    """
+    Function returns dense grid of value averaged over replicates
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Results database
+    value : str
+        Result column, for example "error_phase"
+    rows, columns : str
+        Key columns that span the grid, for example "disable_count" and "speed"
+    Other keyword arguments are equality filters, for example disable_phase="swing"
+    Returns
+    -------
+    Sorted row values, sorted column values and (rows, columns) array,
+    cells without results are NaN
+    """
+    check_columns(value, rows, columns)
+    clause, args = where(filters)
+
+    data = np.array(conn.execute(
+            f"SELECT {rows}, {columns}, AVG({value}) FROM results {clause} "
+            f"GROUP BY {rows}, {columns}", args
+    ).fetchall(), dtype=float).reshape(-1, 3)
+
+    row_values = np.unique(data[:, 0])
+    column_values = np.unique(data[:, 1])
+
+    grid = np.full((len(row_values), len(column_values)), np.nan)
+    grid[np.searchsorted(row_values, data[:, 0]),
+         np.searchsorted(column_values, data[:, 1])] = data[:, 2]
+
+    return row_values, column_values, grid
+
+
+def grouped_stats(conn, value, by, **filters):
+    """
+    Function computes statistics of value for every distinct value
+    of numeric "by" column
+    Returns dictionary of arrays: "by" values, mean, std and count
+    """
+    check_columns(value, by)
+    clause, args = where(filters)
+
+    data = np.array(conn.execute(
+            f"SELECT {by}, AVG({value}), AVG({value} * {value}), COUNT({value}) "
+            f"FROM results {clause} GROUP BY {by} ORDER BY {by}", args
+    ).fetchall(), dtype=float).reshape(-1, 4)
+
+    mean, count = data[:, 1], data[:, 3]
+    # Sample standard deviation from the first two moments
+    variance = (data[:, 2] - mean ** 2) * count / np.maximum(count - 1, 1)
+
+    return {by: data[:, 0], "mean": mean,
+            "std": np.sqrt(np.maximum(variance, 0)), "count": count}
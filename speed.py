@@ -0,0 +1,128 @@
+import numpy as np
+from nengo.processes import Piecewise
+
+from inputs import ScheduleInput
+
+"""
+Step of precomputed profiles, matches nengo simulator step
+"""
+dt = 0.001
+
+
+def constant(value):
+    """
+    Function describes speed that does not change during simulation
+    """
+    return {"kind": "constant", "value": value}
+
+
+def ramp(start=0, end=1, duration=None, onset=0):
+    """
+    Function describes linear change of speed from start to end
+    during duration seconds after onset, duration is simulation time by default
+    """
+    return {"kind": "ramp", "start": start, "end": end,
+            "duration": duration, "onset": onset}
+
+
+def piecewise(points):
+    """
+    Function describes speed that jumps to new values at given times,
+    points is {time: speed} dictionary, speed is zero before the first point
+    """
+    return {"kind": "piecewise", "points": sorted(points.items())}
+
+
+def sampled(values, step=dt):
+    """
+    Function describes speed given by array of values sampled every step seconds,
+    the last value is held after the end of the array
+    """
+    return {"kind": "sampled", "values": np.ravel(values).tolist(), "step": step}
+
+
+def sample(profile, time, dt=dt):
+    """
+    Function returns speed for every simulation step from dt to time,
+    the same values speed node of create_CPG outputs
+    """
+    t = np.arange(1, int(round(time / dt)) + 1) * dt
+    kind = profile["kind"]
+
+    if kind == "constant":
+        return np.full(len(t), profile["value"], dtype=float)
+
+    if kind == "ramp":
+        duration = profile["duration"] or time
+        progress = np.clip((t - profile["onset"]) / duration, 0, 1)
+        return profile["start"] + (profile["end"] - profile["start"]) * progress
+
+    if kind == "piecewise":
+        times, values = zip(*profile["points"])
+        # Same rule as nengo Piecewise with zero interpolation
+        i = np.searchsorted(times, t + 0.5 * dt) - 1
+        return np.where(i >= 0, np.asarray(values, dtype=float)[i], 0.)
+
+    if kind == "sampled":
+        values = np.asarray(profile["values"], dtype=float)
+        i = ((t - dt) / profile["step"] + 1e-7).astype(int)
+        return values[np.minimum(i, len(values) - 1)]
+
+    raise ValueError(f"Unknown speed profile {kind}")
+
+
+def canonical(profile, time, dt=dt):
+    """
+    Function returns one form for profiles with the same samples during time,
+    so equivalent profiles give the same cache and sweep keys
+    Speed that does not change becomes constant, ramp duration is filled in
+    """
+    values = sample(profile, time, dt)
+    if np.all(values == values[0]):
+        return constant(float(values[0]))
+
+    if profile["kind"] == "ramp" and profile["duration"] is None:
+        return dict(profile, duration=time)
+
+    return profile
+
+
+def speed_schedule(profile, time, dt=dt):
+    """
+    Function returns (times, values) schedule of the profile for inputs.ScheduleInput
+    Constant and piecewise profiles keep only change points
+    """
+    kind = profile["kind"]
+
+    if kind == "constant":
+        return np.zeros(1), np.array([profile["value"]], dtype=float)
+
+    if kind == "piecewise":
+        times, values = zip(*profile["points"])
+        return np.array(times, dtype=float), np.array(values, dtype=float)
+
+    # Step n outputs n-th sample
+    values = sample(profile, time, dt)
+    return np.arange(1, len(values) + 1) * dt, values
+
+
+def speed_output(profile, time):
+    """
+    Function returns output of speed node for the profile
+    Constant speed is a plain value, piecewise profile is nengo Piecewise,
+    other profiles are sampled once for the simulation time and every step
+    looks up its sample in inputs.ScheduleInput, the last sample is held
+    when simulation runs longer than time
+    """
+    kind = profile["kind"]
+
+    if kind == "constant":
+        return [profile["value"]]
+
+    if kind == "piecewise":
+        return Piecewise(dict(profile["points"]))
+
+    process = ScheduleInput(1)
+    process.set(*speed_schedule(profile, time))
+
+    return process
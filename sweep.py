@@ -0,0 +1,163 @@
+import hashlib
+import itertools
+import json
+import multiprocessing as mp
+import os
+import time
+from functools import partial
+
+import numpy as np
+from tqdm import tqdm
+
+"""
+Sweep results are appended to a JSON lines file, one finished point per line,
+so an interrupted sweep keeps everything computed before the interruption
+"""
+
+
+def grid(**axes):
+    """
+    Function expands declarative grid into list of points
+    grid(speed=[0, 0.5], disable_count=range(3), replicate=range(15))
+    gives every combination of axis values as a dictionary
+    """
+    names = list(axes)
+
+    return [dict(zip(names, values))
+            for values in itertools.product(*(list(axes[name]) for name in names))]
+
+
+def point_key(point):
+    """
+    Function computes stable identifier of a sweep point
+    """
+    return hashlib.sha1(json.dumps(point, sort_keys=True).encode()).hexdigest()
+
+
+def replicate_seed(base_seed, replicate):
+    """
+    Function derives seed of a replicate from base seed of the sweep,
+    different replicates get independent seeds and the same replicate
+    always gets the same one
+    """
+    return int(np.random.SeedSequence([base_seed, replicate]).generate_state(1)[0])
+
+
+def plan(points, canonical=None):
+    """
+    Function finds points that give the same simulation
+    canonical(point) returns one form for equivalent points, for example
+    the same phase for all points without damage, every canonical point is
+    simulated once
+    Returns list of unique canonical points and canonical key of every point
+    """
+    unique, keys = {}, []
+    for point in points:
+        simulated = canonical(point) if canonical else point
+        key = point_key(simulated)
+        unique.setdefault(key, simulated)
+        keys.append(key)
+
+    return list(unique.values()), keys
+
+
+def load_results(path):
+    """
+    Function reads finished points of a sweep
+    Incomplete last line of interrupted sweep is ignored
+    Returns list of records with "key", "point", "result" and "seconds"
+    """
+    if not os.path.exists(path):
+        return []
+
+    records = []
+    with open(path) as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+
+    return records
+
+
+def end_line(path):
+    """
+    Function terminates incomplete last line left by interrupted sweep,
+    so new records start on their own lines
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def timed_call(func, point):
+    """
+    Function evaluates one sweep point and measures its duration
+    """
+    start = time.perf_counter()
+    result = func(**point)
+
+    return point, result, time.perf_counter() - start
+
+
+def run_sweep(func, points, path, processes=None, progress=True, canonical=None):
+    """
+    Function evaluates func(**point) for every point in a process pool
+    Every result is written to "path" as soon as it is ready, points
+    that already have results there are skipped, so an interrupted sweep
+    continues from where it stopped when it is started again
+    Equivalent points are simulated once, see plan, their result is
+    given to every requested point
+
+    Parameters
+    ----------
+    func : callable
+        Module level function returning json serializable result
+    points : list of dicts
+        Sweep points, for example from grid
+    path : str
+        JSON lines file with results
+    processes : int, optional
+        Size of process pool, number of CPUs by default
+    canonical : callable, optional
+        Function returning canonical form of a point, see plan
+    Returns
+    -------
+    List of records for requested points in their order, see load_results
+    """
+    simulated, keys = plan(points, canonical)
+    if progress and len(simulated) < len(points):
+        print(f"{len(points)} points need {len(simulated)} simulations, "
+              f"{len(points) - len(simulated)} are saved")
+
+    finished = {record["key"]: record for record in load_results(path)}
+    pending = [point for point in simulated if point_key(point) not in finished]
+
+    if pending:
+        end_line(path)
+        with mp.Pool(processes or mp.cpu_count()) as pool, open(path, "a") as f:
+            results = pool.imap_unordered(partial(timed_call, func), pending)
+            for point, result, seconds in tqdm(results, total=len(pending), disable=not progress):
+                record = {"key": point_key(point), "point": point,
+                          "result": result, "seconds": seconds}
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+                finished[record["key"]] = record
+
+    return [dict(finished[key], key=point_key(point), point=point)
+            for point, key in zip(points, keys)]
+
+
+def flat_results(records):
+    """
+    Function merges point and result of every record into one dictionary,
+    the format experiment scripts saved before
+    """
+    return [dict(record["point"], **record["result"], seconds=record["seconds"])
+            for record in records]
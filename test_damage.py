@@ -0,0 +1,52 @@
+import numpy as np
+
+import damage
+
+
+def currents(values, state_neurons):
+    """
+    Function reshapes schedule values into (change point, ensemble, neuron) currents
+    """
+    return values.reshape(len(values), len(damage.ensemble_names), state_neurons)
+
+
+def test_onset_ramp_and_offset():
+    event = damage.lesion(3, phase="swing", limbs=(1,), onset=1, offset=2, ramp=0.3)
+
+    times, values = damage.schedule_table([event], state_neurons=5)
+    values = currents(values, 5)
+
+    np.testing.assert_allclose(times, [0, 1.1, 1.2, 1.3, 2])
+    # One more neuron is disabled every ramp / count seconds, all recover at offset
+    swing1 = damage.ensemble_names.index("swing1")
+    disabled = np.sum(values[:, swing1] == damage.DAMAGE_CURRENT, axis=1)
+    np.testing.assert_array_equal(disabled, [0, 1, 2, 3, 0])
+    np.testing.assert_array_equal(values[3, swing1], [-30, -30, -30, 0, 0])
+
+    others = np.delete(values, swing1, axis=1)
+    assert not others.any()
+
+
+def test_step_onset_and_overlapping_events():
+    schedule = [damage.lesion([4, 2], phase="stance", limbs=(2, 3), onset=0.5, current=-10),
+                damage.lesion(1, phase="all", limbs=(3,), onset=0, offset=1)]
+
+    times, values = damage.schedule_table(schedule, state_neurons=5)
+    values = currents(values, 5)
+
+    np.testing.assert_allclose(times, [0, 0.5, 1])
+    stance2, stance3, swing3 = [damage.ensemble_names.index(name)
+                                for name in ("stance2", "stance3", "swing3")]
+    np.testing.assert_array_equal(values[0, swing3], [-30, 0, 0, 0, 0])
+    np.testing.assert_array_equal(values[1, stance2], [0, 0, -10, 0, -10])
+    # Later event of the schedule wins where both disable a neuron
+    np.testing.assert_array_equal(values[1, stance3], [-30, 0, -10, 0, -10])
+    np.testing.assert_array_equal(values[2, stance3], [0, 0, -10, 0, -10])
+    assert not values[2, swing3].any()
+
+
+def test_applies():
+    assert damage.applies(damage.lesion(2, onset=1), time=2)
+    assert not damage.applies(damage.lesion(2, onset=3), time=2)
+    assert not damage.applies(damage.lesion(0), time=2)
+    assert not damage.applies(damage.lesion(2, onset=1, offset=1), time=2)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+import optimize
+from gait_events import GaitEventDetector
+from test_scoring import TOLERANCE, history, switcher_history
+
+
+def detect(states, capacity=None):
+    """
+    Function feeds history to detector step by step like the simulator does
+    """
+    detector = GaitEventDetector(states.shape[1], *([capacity] if capacity else []))
+    step = detector.make_step((states.shape[1],), (0,), optimize.DT, None, {})
+    for i, x in enumerate(states):
+        step((i + 1) * optimize.DT, x)
+
+    return detector
+
+
+@pytest.mark.parametrize("seed, noise", [(0, 0.), (2, 0.05)])
+def test_detector_error_matches_history_error(seed, noise):
+    states = switcher_history(seed, noise=noise)
+
+    detector = detect(states)
+
+    assert detector.dropped() == 0
+    np.testing.assert_allclose(optimize.detector_error(detector, verbose=False),
+                               optimize.history_error(history(states), verbose=False),
+                               rtol=TOLERANCE)
+
+
+def test_dropped_events_keep_overlaps_of_kept_window():
+    states = switcher_history(1)
+    full = detect(states)
+    events = full.state["events"]
+
+    detector = detect(states, capacity=events // 2)
+
+    assert detector.dropped() == events - events // 2
+    for kept, every in zip(detector.transitions(), full.transitions()):
+        for limb_kept, limb_every in zip(kept, every):
+            np.testing.assert_array_equal(limb_kept, limb_every[len(limb_every) - len(limb_kept):])
+
+    # Overlaps are summed from the sample of the oldest kept transition
+    start = full.state["index"][events - events // 2] + 1
+    swing, stance = states[start:] < 0, states[start:] > 0
+    overlap, swing_time = detector.overlaps()
+    np.testing.assert_array_equal(overlap, swing.T.astype(int) @ stance.astype(int))
+    np.testing.assert_array_equal(swing_time, swing.sum(axis=0))
+
+    with pytest.warns(UserWarning, match="dropped"):
+        optimize.detector_error(detector, verbose=False)
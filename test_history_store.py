@@ -0,0 +1,35 @@
+import numpy as np
+
+import history_store
+
+
+def test_save_load_round_trip(tmp_path):
+    rng = np.random.RandomState(0)
+    history = {"s1_state": rng.randn(100), "swing1_state": rng.randn(100, 1),
+               "cycles": np.array([[3, 10], [10, 42]]), "score": 1.5}
+    name = str(tmp_path / "run.npy")
+
+    history_store.save(name, history, dt=0.001, params={"speed_swing": 3.4})
+
+    for mmap in (True, False):
+        loaded = history_store.load(name, mmap=mmap)
+
+        assert isinstance(loaded["s1_state"], np.memmap) == mmap
+        assert loaded["s1_state"].dtype == np.float32
+        np.testing.assert_array_equal(loaded["s1_state"], history["s1_state"].astype(np.float32))
+        np.testing.assert_array_equal(loaded["swing1_state"],
+                                      history["swing1_state"].ravel().astype(np.float32))
+        assert loaded["cycles"] == [[3, 10], [10, 42]]
+        assert loaded["score"] == 1.5
+        assert loaded["meta"] == {"dt": 0.001, "params": {"speed_swing": 3.4}}
+
+
+def test_save_keeps_dtype(tmp_path):
+    history = {"s1_state": np.linspace(0, 1, 10)}
+    name = str(tmp_path / "run")
+
+    history_store.save(name, history, dtype=np.float64)
+
+    loaded = history_store.load(name)
+    np.testing.assert_array_equal(loaded["s1_state"], history["s1_state"])
+    assert loaded["meta"] == {}
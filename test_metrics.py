@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+import metrics
+
+
+def test_ranks_and_spearman_match_scipy():
+    stats = pytest.importorskip("scipy.stats")
+    rng = np.random.RandomState(0)
+
+    for _ in range(20):
+        # Few distinct values give many ties
+        a, b = rng.randint(0, 5, 30), rng.randint(0, 5, 30) + rng.rand(30) * (rng.rand() > 0.5)
+
+        np.testing.assert_allclose(metrics.ranks(a), stats.rankdata(a))
+        np.testing.assert_allclose(metrics.spearman(a, b), stats.spearmanr(a, b)[0])
+
+    assert np.isnan(metrics.spearman(np.ones(5), np.arange(5)))
+
+
+def test_rmse_and_r2_match_sklearn():
+    sklearn_metrics = pytest.importorskip("sklearn.metrics")
+    rng = np.random.RandomState(1)
+    expected, actual = rng.rand(50), rng.rand(50)
+
+    np.testing.assert_allclose(metrics.rmse(expected, actual),
+                               np.sqrt(sklearn_metrics.mean_squared_error(expected, actual)))
+    np.testing.assert_allclose(metrics.r2_score(expected, actual),
+                               sklearn_metrics.r2_score(expected, actual))
+    # Constant expected values
+    assert metrics.r2_score(np.ones(3), np.ones(3)) == sklearn_metrics.r2_score(np.ones(3), np.ones(3))
+    assert metrics.r2_score(np.ones(3), np.arange(3)) == \
+        sklearn_metrics.r2_score(np.ones(3), np.arange(3))
+
+    with pytest.raises(ValueError):
+        metrics.rmse([], [])
+
+
+def test_blocks_rmse():
+    rng = np.random.RandomState(2)
+    counts = np.array([3, 1, 4])
+    expected, actual = rng.rand(8), rng.rand(8)
+    starts = np.cumsum(counts) - counts
+
+    np.testing.assert_allclose(metrics.blocks_rmse(counts, expected, actual),
+                               [metrics.rmse(expected[s:s + c], actual[s:s + c])
+                                for s, c in zip(starts, counts)])
+
+    with pytest.raises(ValueError):
+        metrics.blocks_rmse(np.array([2, 0]), expected[:2], actual[:2])
+
+
+def test_phase_durations_and_offsets():
+    swing = np.array([[10, 40], [110, 150]])
+    stance = np.array([[40, 110], [150, 230]])
+
+    swing_time, stance_time, cycle = metrics.phase_durations(swing, stance, dt=0.01)
+    np.testing.assert_allclose(swing_time, [0.3, 0.4])
+    np.testing.assert_allclose(stance_time, [0.7, 0.8])
+    np.testing.assert_allclose(cycle, [1.0, 1.2])
+
+    pre, post = metrics.swing_offsets(swing, stance[:1], dt=0.01)
+    np.testing.assert_allclose(pre, [0.3])
+    np.testing.assert_allclose(post, [0.7])
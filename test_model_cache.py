@@ -0,0 +1,21 @@
+import os
+
+import model_cache
+
+
+def test_key_covers_model_sources(monkeypatch):
+    key = model_cache.config_key(params={"a": 1}, time=80)
+    assert key == model_cache.config_key(time=80, params={"a": 1})
+
+    monkeypatch.setitem(model_cache.VERSIONS, "model", "edited")
+    assert key != model_cache.config_key(params={"a": 1}, time=80)
+
+
+def test_unreadable_model_is_removed(tmp_path):
+    path = model_cache.cache_path("broken", str(tmp_path))
+    with open(path, "wb") as f:
+        f.write(b"\x80\x04cnomodule\nf\n.")
+
+    assert model_cache.load("broken", cache_dir=str(tmp_path)) is None
+    assert not os.path.exists(path)
+    assert model_cache.load("missing", cache_dir=str(tmp_path)) is None
@@ -0,0 +1,32 @@
+import numpy as np
+
+import multi_fidelity
+
+
+def test_agreement():
+    lower, higher = [1, 2, 3, 4, 5, 6, 7, 8], [2, 1, 3, 4, 5, 6, 8, 7]
+
+    result = multi_fidelity.agreement(lower, higher, keep=2)
+
+    assert result["candidates"] == 8
+    assert result["top_overlap"] == 1
+    np.testing.assert_allclose(result["spearman"], 1 - 6 * 4 / (8 * 63))
+
+
+def test_custom_tier_settings_reach_trials(monkeypatch):
+    calls = []
+
+    def run_sweep(func, points, path, processes=None, progress=True):
+        calls.append((path, points))
+        return [{"result": {"error": 0.}} for _ in points]
+
+    monkeypatch.setattr(multi_fidelity.sweep, "run_sweep", run_sweep)
+    tier = {"name": "tiny", "state_neurons": 20, "time": 5, "neuron_type": "LIFRate"}
+
+    results = multi_fidelity.evaluate_tier([{"a": 1.}, {"a": 2.}], tier, "test", progress=False)
+
+    assert results == [{"error": 0.}] * 2
+    path, points = calls[0]
+    assert path == "test_tiny.jsonl"
+    assert points[1] == {"params": {"a": 2.},
+                         "settings": {"state_neurons": 20, "time": 5, "neuron_type": "LIFRate"}}
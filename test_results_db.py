@@ -0,0 +1,61 @@
+import numpy as np
+
+import results_db
+
+
+def results_fixture():
+    """
+    In-memory database with two phases, three counts, two speeds
+    and two seeds, one cell has no results
+    """
+    conn = results_db.connect(":memory:")
+    records = []
+    for phase in ["swing", "stance"]:
+        for count in [1, 2, 3]:
+            for speed in [0.5, 1.0]:
+                if (phase, count, speed) == ("swing", 2, 1.0):
+                    continue
+                for seed in [7, 8]:
+                    error = count * speed + seed / 10 + (phase == "stance")
+                    records.append({"point": {"disable_phase": phase, "disable_count": count,
+                                              "speed": speed, "seed": seed},
+                                    "result": {"error": error}})
+    results_db.insert(conn, records, params={"p": 1})
+
+    return conn
+
+
+def test_query_grid():
+    conn = results_fixture()
+
+    counts, speeds, grid = results_db.query_grid(conn, "error", "disable_count", "speed",
+                                                 disable_phase="swing")
+
+    np.testing.assert_array_equal(counts, [1, 2, 3])
+    np.testing.assert_array_equal(speeds, [0.5, 1.0])
+    # Mean over seeds 7 and 8
+    np.testing.assert_allclose(grid, [[1.25, 1.75], [1.75, np.nan], [2.25, 3.75]])
+
+
+def test_grouped_stats():
+    conn = results_fixture()
+
+    stats = results_db.grouped_stats(conn, "error", "disable_count", disable_phase="stance")
+    rows = results_db.query_rows(conn, ["disable_count", "error"], disable_phase="stance")
+    counts, errors = np.array(rows["disable_count"]), np.array(rows["error"])
+
+    np.testing.assert_array_equal(stats["disable_count"], [1, 2, 3])
+    for i, count in enumerate([1, 2, 3]):
+        values = errors[counts == count]
+        assert stats["count"][i] == len(values) == 4
+        np.testing.assert_allclose(stats["mean"][i], np.mean(values))
+        np.testing.assert_allclose(stats["std"][i], np.std(values, ddof=1))
+
+
+def test_query_rows():
+    conn = results_fixture()
+
+    rows = results_db.query_rows(conn, ["speed", "seed", "error"], disable_phase="swing",
+                                 disable_count=2)
+
+    assert sorted(zip(rows["speed"], rows["seed"], rows["error"])) == [(0.5, 7, 1.7), (0.5, 8, 1.8)]
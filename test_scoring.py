@@ -0,0 +1,180 @@
+import numpy as np
+import pytest
+
+import metrics
+import optimize
+
+"""
+Losses of scoring functions are compared with reference implementations
+on fixed switcher histories, they are exact up to summation order
+"""
+TOLERANCE = 1e-12
+
+"""
+Parameters of a walking CPG
+"""
+PARAMS = {"init_stance": 0.50191, "init_stance_position": 0.49604, "init_swing": 4.6773,
+          "speed_stance": 3.8701, "speed_swing": 3.4240, "inner_inhibit": -0.44423,
+          "sw_sw_con": 0.83093, "st_sw_con": -0.70609, "sw_st_con": -0.77690, "st_st_con": 0.48151,
+          "sw_sw_con_new": -0.81191, "st_sw_con_new": -0.89918, "sw_st_con_new": -0.71148,
+          "st_st_con_new": 0.04916}
+
+
+def switcher_history(seed, time=20, noise=0., stalled=(), lags=(0, 0.5, 0, 0.5)):
+    """
+    Function makes (time x limb) switcher history of a walk that speeds up,
+    lags are phases of limbs in cycles, by default lag limbs are half a cycle
+    behind lead limbs as in QUADRUPED_PAIRS,
+    noise adds sign flickering around transitions
+    """
+    rng = np.random.RandomState(seed)
+    t = np.arange(int(round(time / optimize.DT))) * optimize.DT
+    # Cycle shortens from about 1.5 to 0.7 seconds
+    phase = np.cumsum(0.6 + 0.8 * t / time) * optimize.DT + rng.rand()
+    offsets = np.array(lags) + 0.05 * rng.randn(len(lags))
+
+    states = np.sin(2 * np.pi * (phase[:, None] + offsets)) + 0.3
+    states += noise * rng.randn(*states.shape)
+    states[:, list(stalled)] = 1
+
+    return states
+
+
+def reference_cycles(state_probe):
+    """
+    Loop and string search based cycle detection of the first scoring version
+    """
+    state_str = "".join(str(int(s)) for s in state_probe < 0)
+
+    def findall(p):
+        i, positions = state_str.find(p), []
+        while i != -1:
+            positions.append(i)
+            i = state_str.find(p, i + 1)
+        return positions
+
+    stance_swing, swing_stance = findall("01"), findall("10")
+    swing_cycles, stance_cycles = [], []
+    for start_swing in stance_swing:
+        start_stance_i = np.searchsorted(swing_stance, start_swing)
+        if start_stance_i >= len(swing_stance):
+            break
+        start_stance = swing_stance[start_stance_i]
+
+        end_stance_i = np.searchsorted(stance_swing, start_stance)
+        end_stance = len(state_probe) if end_stance_i >= len(stance_swing) \
+            else stance_swing[end_stance_i]
+
+        swing_cycles.append((start_swing, start_stance))
+        stance_cycles.append((start_stance, end_stance))
+
+    return swing_cycles[1:-1], stance_cycles[1:-1]
+
+
+def reference_history_error(history, dt=optimize.DT, limbs=optimize.SCORING_PROBES,
+                            pairs=optimize.QUADRUPED_PAIRS):
+    """
+    sklearn based history_error of the first scoring version,
+    with its four limbs and pairs replaced by limbs and pairs
+    """
+    mean_squared_error = pytest.importorskip("sklearn.metrics").mean_squared_error
+
+    def rmse(expected, actual):
+        return np.sqrt(mean_squared_error(expected, actual))
+
+    def single_limb_error(swing_cycles, stance_cycles):
+        swing = np.array([(right - left) * dt for left, right in swing_cycles])
+        stance = np.array([(right - left) * dt for left, right in stance_cycles])
+        combined = swing + stance
+
+        error_phase = rmse(metrics.cycle_to_swing(combined), swing) + \
+            rmse(metrics.cycle_to_stance(combined), stance)
+        error_speed = abs(optimize.MIN_PHASE - min(combined)) + \
+            abs(optimize.MAX_PHASE - max(combined))
+
+        return error_phase, error_speed
+
+    def symmetry_error(swing_cycles, stance_cycles):
+        pre = [abs(sw[0] - st[0]) * dt for sw, st in zip(swing_cycles, stance_cycles)]
+        post = [abs(st[1] - sw[1]) * dt for sw, st in zip(swing_cycles, stance_cycles)]
+
+        return rmse(pre, post)
+
+    states = [np.ravel(history[name]) for name in limbs]
+    try:
+        cycles = [reference_cycles(state) for state in states]
+        limb_errors = [single_limb_error(*limb) for limb in cycles]
+        error_phase = sum(phase for phase, _ in limb_errors)
+        error_speed = sum(speed for _, speed in limb_errors)
+
+        error_symmetricity1 = 0
+        error_symmetricity2 = 0
+        for lead, lag in pairs:
+            error_symmetricity1 += symmetry_error(cycles[lead][0][1:], cycles[lag][1]) + \
+                symmetry_error(cycles[lag][0], cycles[lead][1][:-1])
+            for swinging, standing in [(lead, lag), (lag, lead)]:
+                swing, stance = states[swinging] < 0, states[standing] > 0
+                error_symmetricity2 += 1 - np.sum(swing & stance) / np.sum(swing)
+
+    except Exception:
+        error_phase = error_speed = error_symmetricity1 = error_symmetricity2 = optimize.PENALTY
+
+    return (optimize.total_error(error_phase, error_speed, error_symmetricity1, error_symmetricity2),
+            error_phase, error_speed, error_symmetricity1, error_symmetricity2)
+
+
+def history(states):
+    return {f"s{i + 1}_state": states[:, i] for i in range(states.shape[1])}
+
+
+@pytest.mark.parametrize("seed, noise, stalled", [
+    (0, 0., ()),
+    (1, 0., ()),
+    (2, 0.05, ()),
+    (3, 0.2, ()),
+    (4, 0., (2,)),
+])
+def test_history_error_matches_reference(seed, noise, stalled):
+    states = switcher_history(seed, noise=noise, stalled=stalled)
+
+    expected = reference_history_error(history(states))
+    actual = optimize.history_error(history(states), verbose=False)
+
+    np.testing.assert_allclose(actual, expected, rtol=TOLERANCE)
+    assert (actual[0] == optimize.total_error(*[optimize.PENALTY] * 4)) == bool(stalled)
+
+
+@pytest.mark.parametrize("lags, pairs", [
+    ((0, 0.5), [(0, 1)]),
+    ((0, 0.5, 0, 0.5, 0, 0.5), [(0, 1), (3, 2), (4, 5), (0, 3), (1, 2), (3, 4), (2, 5)]),
+])
+def test_history_error_of_any_number_of_limbs(lags, pairs):
+    states = switcher_history(6, noise=0.05, lags=lags)
+    limbs = list(history(states))
+
+    expected = reference_history_error(history(states), limbs=limbs, pairs=pairs)
+    actual = optimize.history_error(history(states), verbose=False, limbs=limbs, pairs=pairs)
+
+    assert actual[0] < optimize.total_error(*[optimize.PENALTY] * 4)
+    np.testing.assert_allclose(actual, expected, rtol=TOLERANCE)
+
+
+def test_history_error_penalty_for_short_history():
+    states = switcher_history(5, time=1)
+
+    assert optimize.history_error(history(states), verbose=False) == \
+        reference_history_error(history(states))
+
+
+def test_spectral_metric_penalty_for_short_history():
+    states = switcher_history(0)
+    losses = optimize.history_error(history(states), verbose=False, metric="spectral")
+    assert losses[0] < optimize.total_error(*[optimize.PENALTY] * 4)
+
+    short = switcher_history(0, time=3)
+    assert optimize.history_error(history(short), verbose=False, metric="spectral")[0] == \
+        optimize.total_error(*[optimize.PENALTY] * 4)
+
+    # Rate model run shorter than one spectral window
+    for _, *losses in optimize.rate_simulation_error([PARAMS, PARAMS], 3, metric="spectral"):
+        assert losses == [optimize.total_error(*[optimize.PENALTY] * 4)] + [optimize.PENALTY] * 4
@@ -0,0 +1,71 @@
+import nengo
+import numpy as np
+import pytest
+
+import speed
+from inputs import ScheduleInput
+
+PROFILES = [
+    speed.constant(0.7),
+    speed.ramp(0.2, 1.0, duration=0.1, onset=0.05),
+    speed.ramp(1.0, 0.0),
+    speed.piecewise({0.05: 0.3, 0.1: 0.9, 0.15: 0.5}),
+    speed.sampled(np.linspace(0, 1, 40), step=0.005),
+]
+
+
+def simulate(profile, time, run_time):
+    """
+    Function runs speed node of the profile built for time seconds
+    """
+    with nengo.Network() as model:
+        node = nengo.Node(speed.speed_output(profile, time))
+        probe = nengo.Probe(node)
+
+    with nengo.Simulator(model, progress_bar=False) as sim:
+        sim.run(run_time)
+
+    return sim.data[probe].ravel()
+
+
+def test_sample_values():
+    np.testing.assert_array_equal(speed.sample(speed.constant(0.7), 0.003), [0.7] * 3)
+    np.testing.assert_allclose(speed.sample(speed.ramp(0, 1, duration=0.004, onset=0.001), 0.006),
+                               [0, 0.25, 0.5, 0.75, 1, 1])
+    np.testing.assert_array_equal(speed.sample(speed.piecewise({0.002: 1, 0.004: 2}), 0.005),
+                                  [0, 1, 1, 2, 2])
+    # Every value lasts step seconds, the last one is held
+    np.testing.assert_array_equal(speed.sample(speed.sampled([1, 2], step=0.002), 0.006),
+                                  [1, 1, 2, 2, 2, 2])
+
+    with pytest.raises(ValueError):
+        speed.sample({"kind": "sine"}, 1)
+
+
+@pytest.mark.parametrize("profile", PROFILES, ids=lambda p: p["kind"])
+def test_speed_schedule_matches_sample(profile):
+    time = 0.2
+    times, values = speed.speed_schedule(profile, time)
+
+    process = ScheduleInput(1)
+    process.set(times, values)
+    step = process.make_step((0,), (1,), speed.dt, None, None)
+    t = np.arange(1, int(round(time / speed.dt)) + 1) * speed.dt
+
+    np.testing.assert_allclose([step(ti)[0] for ti in t], speed.sample(profile, time))
+
+
+@pytest.mark.parametrize("profile", PROFILES, ids=lambda p: p["kind"])
+def test_speed_node_outputs_samples(profile):
+    time = 0.2
+    output = simulate(profile, time, run_time=time + 0.05)
+
+    np.testing.assert_allclose(output[:200], speed.sample(profile, time))
+    # Profile sampled for time holds its last value when simulation runs longer
+    np.testing.assert_allclose(output[200:], speed.sample(profile, time)[-1])
+
+
+def test_canonical():
+    assert speed.canonical(speed.ramp(0.5, 0.5), 1) == speed.constant(0.5)
+    assert speed.canonical(speed.sampled([0.3] * 10), 1) == speed.constant(0.3)
+    assert speed.canonical(speed.ramp(0, 1), 2)["duration"] == 2
@@ -0,0 +1,63 @@
+import json
+
+import sweep
+
+
+def square(x, replicate=0):
+    return {"square": x * x}
+
+
+def results(records):
+    return [record["result"]["square"] for record in records]
+
+
+def test_grid_and_replicate_seed():
+    assert sweep.grid(x=[1, 2], replicate=range(2)) == \
+        [{"x": 1, "replicate": 0}, {"x": 1, "replicate": 1},
+         {"x": 2, "replicate": 0}, {"x": 2, "replicate": 1}]
+    assert sweep.replicate_seed(3, 1) == sweep.replicate_seed(3, 1)
+    assert sweep.replicate_seed(3, 1) != sweep.replicate_seed(3, 2)
+
+
+def test_resume_skips_finished_points(tmp_path):
+    path = str(tmp_path / "sweep.jsonl")
+    points = sweep.grid(x=range(4))
+
+    records = sweep.run_sweep(square, points[:2], path, processes=1, progress=False)
+    assert results(records) == [0, 1]
+
+    # Finished point with a stored result that func would not give,
+    # followed by a line cut off by an interruption
+    finished = {"key": sweep.point_key(points[2]), "point": points[2],
+                "result": {"square": -1}, "seconds": 0}
+    with open(path, "a") as f:
+        f.write(json.dumps(finished) + "\n")
+        f.write('{"key": "cut')
+
+    records = sweep.run_sweep(square, points, path, processes=1, progress=False)
+    assert results(records) == [0, 1, -1, 9]
+    assert [record["point"] for record in records] == points
+
+    # Only the missing point was appended, on its own line
+    saved = sweep.load_results(path)
+    assert [record["point"] for record in saved] == points
+    assert results(sweep.run_sweep(square, points, path, processes=1, progress=False)) == \
+        [0, 1, -1, 9]
+    assert len(sweep.load_results(path)) == 4
+
+
+def test_equivalent_points_are_simulated_once(tmp_path):
+    path = str(tmp_path / "sweep.jsonl")
+    points = sweep.grid(x=[-2, 2, 3])
+
+    def canonical(point):
+        return {"x": abs(point["x"])}
+
+    records = sweep.run_sweep(square, points, path, processes=1, progress=False,
+                              canonical=canonical)
+
+    assert results(records) == [4, 4, 9]
+    assert [record["point"] for record in records] == points
+    assert len(sweep.load_results(path)) == 2
+    assert sweep.flat_results(records)[0] == {"x": -2, "square": 4,
+                                              "seconds": records[0]["seconds"]}
@@ -2,14 +2,34 @@ from datetime import datetime
 from ray import tune, train
 
 
-def ray_wrapper(func):
+def ray_wrapper(func, window=None):
+    """
+    Function wraps simulation_error for ray tune
+    With "window" the simulation is reported after every window of that many
+    simulated seconds, so trial schedulers can stop bad trials early
+    """
+    def report(sim_time, error, error_phase, error_speed, error_sym1, error_sym2):
+        train.report(dict(error=error,
+                          error_phase=error_phase,
+                          error_speed=error_speed,
+                          error_symmetricity1=error_sym1,
+                          error_symmetricity2=error_sym2,
+                          sim_time=sim_time
+                          )
+                     )
+
     def inner(params):
+        if window is not None:
+            func(params, window=window, report=report)
+            return
+
         history, error, error_phase, error_speed, error_sym1, error_sym2 = func(params)
         train.report(dict(error=error,
                           error_phase=error_phase,
                           error_speed=error_speed,
                           error_symmetricity1=error_sym1,
-                          error_symmetricity2=error_sym2
+                          error_symmetricity2=error_sym2,
+                          abort_reason=history.get("abort_reason", "")
                           )
                      )
 
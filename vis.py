@@ -1,7 +1,7 @@
 import numpy as np
-import json
 import matplotlib.pyplot as plt
 import optimize
+import history_store
 import tune_optimize_utils as utils
 
 tau = 0.01
@@ -12,12 +12,9 @@ if __name__ == "__main__":
 
     # history = optimize.simulation(params=utils.best_params[0], progress_bar=True)
 
-    # for k in history.keys():
-    #     history[k] = history[k][:, 0].tolist()
+    # history_store.save("history", history, dt=0.001)
 
-    # json.dump(history, open("history.json", 'w'))
-
-    history = json.load(open("history.json"))
+    history = history_store.load("history")
 
     start = 0 * 1000
     end = 5 * 1000
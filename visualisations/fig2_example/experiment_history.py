@@ -1,9 +1,8 @@
-import json
-
 import sys
 
 sys.path.insert(0, "../../")
 import optimize
+import history_store
 import numpy as np
 import tune_optimize_utils as utils
 
@@ -26,12 +25,9 @@ if __name__ == "__main__":
     true_s1_swing_duration = optimize.cycle_to_swing(combined_cycles)
     true_s1_stance_duration = optimize.cycle_to_stance(combined_cycles)
 
-    for k in history.keys():
-        history[k] = history[k][:, 0].tolist()
-
-    history["s1_swing_cycles"] = s1_swing_cycles
-    history["s1_stance_cycles"] = s1_stance_cycles
+    history["s1_swing_cycles"] = s1_swing_cycles.tolist()
+    history["s1_stance_cycles"] = s1_stance_cycles.tolist()
     history["true_s1_swing_duration"] = true_s1_swing_duration.tolist()
     history["true_s1_stance_duration"] = true_s1_stance_duration.tolist()
 
-    json.dump(history, open("experiment_history.json", 'w'))
+    history_store.save("experiment_history", history, dt=0.001)
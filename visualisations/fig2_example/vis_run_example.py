@@ -1,13 +1,15 @@
 import numpy as np
-import json
 import os
 import matplotlib.pyplot as plt
 import matplotlib as mpl
+import sys
+sys.path.insert(0, "../..")
+import history_store
 
 if __name__ == "__main__":
     name = "experiment_history"
 
-    history = json.load(open(f"{name}.json"))
+    history = history_store.load(name)
 
     history_len = int(len(history["swing1_state"]) / 1000)
 
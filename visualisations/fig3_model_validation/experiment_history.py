@@ -1,9 +1,8 @@
-import json
-
 import sys
 
 sys.path.insert(0, "../../")
 import optimize
+import history_store
 import numpy as np
 import tune_optimize_utils as utils
 
@@ -60,17 +59,14 @@ if __name__ == "__main__":
     true_s4_swing_duration = optimize.cycle_to_swing(combined_cycles4)
     true_s4_stance_duration = optimize.cycle_to_stance(combined_cycles4)
 
-    for k in history.keys():
-        history[k] = history[k][:, 0].tolist()
-
-    history["s1_swing_cycles"] = s1_swing_cycles
-    history["s1_stance_cycles"] = s1_stance_cycles
-    history["s2_swing_cycles"] = s2_swing_cycles
-    history["s2_stance_cycles"] = s2_stance_cycles
-    history["s3_swing_cycles"] = s3_swing_cycles
-    history["s3_stance_cycles"] = s3_stance_cycles
-    history["s4_swing_cycles"] = s4_swing_cycles
-    history["s4_stance_cycles"] = s4_stance_cycles
+    history["s1_swing_cycles"] = s1_swing_cycles.tolist()
+    history["s1_stance_cycles"] = s1_stance_cycles.tolist()
+    history["s2_swing_cycles"] = s2_swing_cycles.tolist()
+    history["s2_stance_cycles"] = s2_stance_cycles.tolist()
+    history["s3_swing_cycles"] = s3_swing_cycles.tolist()
+    history["s3_stance_cycles"] = s3_stance_cycles.tolist()
+    history["s4_swing_cycles"] = s4_swing_cycles.tolist()
+    history["s4_stance_cycles"] = s4_stance_cycles.tolist()
     history["true_s1_swing_duration"] = true_s1_swing_duration.tolist()
     history["true_s1_stance_duration"] = true_s1_stance_duration.tolist()
     history["true_s2_swing_duration"] = true_s2_swing_duration.tolist()
@@ -80,4 +76,4 @@ if __name__ == "__main__":
     history["true_s4_swing_duration"] = true_s4_swing_duration.tolist()
     history["true_s4_stance_duration"] = true_s4_stance_duration.tolist()
 
-    json.dump(history, open("experiment_history.json", 'w'))
+    history_store.save("experiment_history", history, dt=0.001)
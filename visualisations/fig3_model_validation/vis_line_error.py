@@ -1,14 +1,16 @@
-import json
 import os
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib as mpl
-from sklearn.metrics import r2_score
+import sys
+sys.path.insert(0, "../..")
+import history_store
+from metrics import r2_score
 
 tau = 0.01
 
 if __name__ == "__main__":
-    history = json.load(open("./experiment_history.json"))
+    history = history_store.load("./experiment_history")
 
     plt.rcParams['font.size'] = 18
     plt.rcParams['axes.linewidth'] = 2
@@ -1,5 +1,4 @@
 import numpy as np
-import json
 import os
 import matplotlib.pyplot as plt
 import matplotlib as mpl
@@ -7,6 +6,9 @@ from sklearn.metrics import r2_score
 from sklearn.linear_model import LinearRegression
 
 from scipy.optimize import curve_fit
+import sys
+sys.path.insert(0, "../..")
+import history_store
 
 if __name__ == "__main__":
     plt.rcParams['font.size'] = 18
@@ -14,7 +16,7 @@ if __name__ == "__main__":
     mpl.rcParams['pdf.fonttype'] = 42
     mpl.rcParams['ps.fonttype'] = 42
 
-    history = json.load(open("./experiment_history.json"))
+    history = history_store.load("./experiment_history")
 
     fig = plt.figure(figsize=(10, 10))
 
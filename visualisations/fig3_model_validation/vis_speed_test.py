@@ -1,14 +1,16 @@
 import numpy as np
-import json
 import os
 import matplotlib.pyplot as plt
 import matplotlib as mpl
-from sklearn.metrics import r2_score
 from scipy.optimize import curve_fit
+import sys
+sys.path.insert(0, "../..")
+import history_store
+from metrics import r2_score
 
 
 if __name__ == "__main__":
-    history = json.load(open("../data_gen/experiment_history.json"))
+    history = history_store.load("../data_gen/experiment_history")
 
     swing_cycles, stance_cycles = history["s1_swing_cycles"], history["s1_stance_cycles"]
 
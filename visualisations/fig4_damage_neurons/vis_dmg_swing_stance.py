@@ -1,30 +1,25 @@
-import json
 import numpy as np
 import os
-from collections import defaultdict
+import sys
 
 import matplotlib.pyplot as plt
 import matplotlib as mpl
 import pandas as pd
 import seaborn as sns
 
-if __name__ == "__main__":
-    dmg_swing_stance = json.load(open('../data_gen/dmg_swing_stance_15.json', 'r'))
+sys.path.insert(0, "../..")
+import results_db
 
-    d_swing = defaultdict(list)
-    d_stance = defaultdict(list)
+if __name__ == "__main__":
+    conn = results_db.connect('../data_gen/dmg_swing_stance_15.db')
 
-    for e in dmg_swing_stance:
-        x = round((e["disable_count"]/300)*100, 1)
-        if x >= 3.5:
-            continue
-        y = e["error"]
-        if e["disable_phase"] == "swing":
-            d_swing['x'].append(x)
-            d_swing['y'].append(y)
-        elif e["disable_phase"] == "stance":
-            d_stance['x'].append(x)
-            d_stance['y'].append(y)
+    # Every replicate is needed for bootstrap confidence interval
+    data = {}
+    for phase in ["swing", "stance"]:
+        rows = results_db.query_rows(conn, ["disable_count", "error"], disable_phase=phase)
+        x = np.round((np.array(rows["disable_count"])/300)*100, 1)
+        keep = x < 3.5
+        data[phase] = pd.DataFrame(data={'x': x[keep], 'y': np.array(rows["error"])[keep]})
 
     plt.rcParams['font.size'] = 18
     plt.rcParams['axes.linewidth'] = 2
@@ -35,12 +30,8 @@ if __name__ == "__main__":
 
     ax = plt.gca()
 
-    print(len(d_swing["x"]))
-    df_swing = pd.DataFrame(data=d_swing)
-    df_stance = pd.DataFrame(data=d_stance)
-
     sns.lineplot(ax = ax,
-             data = df_swing,
+             data = data["swing"],
              x = 'x',
              y = 'y',
              ci = 95,
@@ -49,7 +40,7 @@ if __name__ == "__main__":
              color="#0081D9")
 
     sns.lineplot(ax = ax,
-             data = df_stance,
+             data = data["stance"],
              x = 'x',
              y = 'y',
              ci = 95,
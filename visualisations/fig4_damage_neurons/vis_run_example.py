@@ -1,8 +1,10 @@
 import numpy as np
-import json
 import os
 import matplotlib.pyplot as plt
 import matplotlib as mpl
+import sys
+sys.path.insert(0, "../..")
+import history_store
 
 
 if __name__ == "__main__":
@@ -10,7 +12,7 @@ if __name__ == "__main__":
     for dmg_type in ["swing", "stance"]:
         name = f"experiment_dmg_{dmg_type}"
 
-        history = json.load(open(f"{name}_history.json"))
+        history = history_store.load(f"{name}_history")
 
         history_len = int(len(history["swing1_state"])/1000)
 
@@ -1,44 +1,45 @@
 import os
 import sys
 sys.path.insert(0, "../src")
-from optimize import simulation_error
-import json
-from tqdm import tqdm
+from optimize import reused_simulation_error
+from damage import applies, lesion
+from speed import constant
+import sweep
+import results_db
 import tune_optimize_utils as utils
-from functools import partial
-import multiprocessing as mp
 
 
-def disable_f(t, disable_count, disable_phase, state_neurons, time, phase):
-    neuron_signal = [0]*state_neurons
+def damage_schedule(disable_count, disable_phase):
+    return [lesion(disable_count, disable_phase, limbs=(1, 2),
+                   onset=5, offset=25)]
 
-    if disable_phase == "all" or disable_phase in phase:
-        if 5 <= t and t <= 25:
-            for i in range(disable_count):
-                neuron_signal[i] = -30
 
-    return neuron_signal
+def canonical_point(point):
+    # Without disabled neurons every phase gives the same run
+    if not any(applies(event, 30) for event in
+               damage_schedule(point["disable_count"], point["disable_phase"])):
+        return dict(point, disable_phase="all")
 
+    return point
 
-def get_statistics(args):
-    disable_count, speed, disable_phase = args
 
-    dmg_disable_f = partial(disable_f, disable_count=disable_count,
-                            disable_phase=disable_phase)
+def get_statistics(disable_count, speed, disable_phase):
 
-    res = simulation_error(utils.best_params[0], 
-                            progress_bar=False,
-                            time=30,
-                            speed_f= lambda _: speed,
-                            dmg_f=dmg_disable_f,
-                          )
+    schedule = damage_schedule(disable_count, disable_phase)
+
+    # Every worker builds the model once and only replaces its inputs,
+    # first 5 s before damage are simulated once per speed and then forked
+    res = reused_simulation_error(utils.best_params[0], 
+                                  progress_bar=False,
+                                  time=30,
+                                  speed_profile=constant(speed),
+                                  damage=schedule,
+                                  prefix=5,
+                                 )
 
     _, _, error_phase, _, _, _ = res
 
     return {
-        "disable_count":disable_count,
-        "speed":speed,
-        "disable_phase":disable_phase,
         "error_phase":error_phase,
     }
 
@@ -47,21 +48,15 @@ def get_statistics(args):
 if __name__ == "__main__":
     os.environ["PYOPENCL_CTX"] = '0'
 
-    args = []
-    args.extend([(disable_count, speed/50, "swing")
-        for speed in range(0, 51) 
-        for disable_count in range(0, 26)])
-    args.extend([(disable_count, speed/50, "stance")
-        for speed in range(0, 51) 
-        for disable_count in range(0, 26)])
-
-    pool = mp.Pool(mp.cpu_count())
-    mapped_values = list(tqdm(pool.imap_unordered(get_statistics, args), 
-                            total=len(args)))
+    # Points with the same speed follow each other and share the warm-up snapshot
+    points = sweep.grid(speed=[speed/50 for speed in range(0, 51)],
+                        disable_phase=["swing", "stance"],
+                        disable_count=range(0, 26))
 
-    pool.close()
-    pool.join()
+    # Finished points are kept in jsonl file, restart continues the sweep
+    records = sweep.run_sweep(get_statistics, points, "dmg_speed_count_25_may.jsonl",
+                              canonical=canonical_point)
 
-    with open('dmg_speed_count_25_may.json', 'w') as f:
-        json.dump(mapped_values, f, indent=4)
+    conn = results_db.connect("dmg_speed_count_25_may.db")
+    results_db.insert(conn, records, params=utils.best_params[0])
     
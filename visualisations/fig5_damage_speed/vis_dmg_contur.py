@@ -1,14 +1,16 @@
 import matplotlib.pyplot as plt
 plt.style.use('seaborn-white')
 import numpy as np
-import json
 import os
+import sys
+sys.path.insert(0, "../..")
+import results_db
 
 
 import plotly.graph_objects as go
 
 if __name__ == "__main__":
-
+    conn = results_db.connect("dmg_speed_count_25_may.db")
 
     for disable_type in ["swing", "stance"]:
         t2m = {
@@ -16,22 +18,10 @@ if __name__ == "__main__":
             "stance": "extensor"
         }
 
-        dmg_speed_count = json.load(open("dmg_speed_count_25_may.json"))
-        x = sorted(set([e["speed"] for e in dmg_speed_count]))
-        y = np.array(sorted(set([e["disable_count"] for e in dmg_speed_count])))/3
-        y = y[:-5]
-
-        def get_error(x, y):
-            y = int(y*3)
-            example = [e for e in dmg_speed_count 
-                        if e["speed"] == x and e["disable_count"] == y and e["disable_phase"]==disable_type][0]
-            return example["error_phase"]
-
-        xv, yv = np.meshgrid(x, y)
-
-
-        vf = np.vectorize(get_error)
-        zv = vf(xv, yv)
+        counts, x, zv = results_db.query_grid(conn, "error_phase", "disable_count", "speed",
+                                              disable_phase=disable_type)
+        y = counts[:-5]/3
+        zv = zv[:-5]
 
 
         fig = go.Figure(data =